@@ -1,14 +1,26 @@
 from fastapi import FastAPI, HTTPException, Request
-import uvicorn
 from pydantic import BaseModel
-import json
+import logging
 from typing import Optional, Dict, Any, List
 from fastapi.middleware.cors import CORSMiddleware
 
-from transform_xhs import extract_xhs_content
+# 这里是 Vercel 的入口，冷启动时间直接计入用户请求的延迟：
+# 解析相关的依赖（transform_xhs、requests、BeautifulSoup）在第一次调用 /extract 时才加载，
+# / 和 /health 不会加载它们。导入耗时可以用 bench_import_time.py 查看。
 
 app = FastAPI()
 
+_extract_xhs_content = None
+
+def get_extractor():
+    """第一次使用时加载解析逻辑"""
+    global _extract_xhs_content
+    if _extract_xhs_content is None:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        from transform_xhs import extract_xhs_content
+        _extract_xhs_content = extract_xhs_content
+    return _extract_xhs_content
+
 # 添加 CORS 中间件
 app.add_middleware(
     CORSMiddleware,
@@ -44,7 +56,7 @@ def extract_content(request: XHSRequest):
     Extract content from a Xiaohongshu URL.
     Returns title, description, images, and other metadata.
     """
-    result = extract_xhs_content(request.url)
+    result = get_extractor()(request.url)
     
     if not result or "error" in result:
         raise HTTPException(status_code=400, detail=result.get("error", "Failed to extract content"))
@@ -59,4 +71,5 @@ def extract_content(request: XHSRequest):
     return result
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
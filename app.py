@@ -1,10 +1,17 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import os
-import json
-from typing import List, Optional
+import asyncio
+import threading
+from typing import List, Optional, Literal
 from xiaohongshu_scraper import XiaohongshuScraper, extract_xiaohongshu_url
+from result_store import get_store
+from image_pipeline import ImagePipeline
+from media_server import resolve_media_path, media_response, media_url
+from scrape_cluster import ScrapeCluster, WorkerCrashed
+from note_watcher import NoteWatcher
 
 app = FastAPI(title="小红书内容抓取API", description="抓取小红书帖子内容的API")
 
@@ -13,48 +20,129 @@ os.makedirs('xiaohongshu_posts', exist_ok=True)
 
 # 全局变量存储scraper实例
 scraper = None
+# 可选的图片后处理进程池（XHS_IMAGE_PIPELINE=1 时启用）
+image_pipeline = None
+# 浏览器预热状态：starting / ready / failed
+warmup_state = {'status': 'starting', 'error': None}
+warmup_thread = None
+# 多进程模式（XHS_SCRAPE_WORKERS>0）：每个工作进程一个浏览器，任务按笔记ID分片
+SCRAPE_WORKERS = int(os.environ.get('XHS_SCRAPE_WORKERS') or 0)
+cluster = None
+# 等待工作进程返回抓取结果的最长时间（秒）
+SCRAPE_TIMEOUT = float(os.environ.get('XHS_SCRAPE_TIMEOUT') or 300)
+# 单浏览器模式下同一时间只能处理一个抓取任务（接口请求和监控共用）
+scrape_lock = threading.Lock()
+# 笔记/作者增量监控
+watcher = None
 
 class ScrapeRequest(BaseModel):
     url: str
     save_metadata: bool = False
+    image_variant: Optional[Literal['original', 'webp', 'thumbnail']] = None
+
+class WatchRequest(BaseModel):
+    url: str
+    interval: Optional[float] = None  # 初始检查间隔（秒）
 
 class ScrapeResponse(BaseModel):
     title: str
+    author: Optional[str] = None
     content: str
     image_urls: List[str]
     downloaded_files: List[str]
+    video_url: Optional[str] = None
+    video_file: Optional[str] = None
+    media_urls: List[str] = []
     output_dir: str
     saved_metadata_path: Optional[str] = None
 
+def warm_up_scraper():
+    """在后台启动浏览器并完成首次导航，完成前 /ready 返回503"""
+    global scraper
+    try:
+        print("启动浏览器...")
+        instance = XiaohongshuScraper(image_pipeline=image_pipeline)
+        instance.warm_up()
+        scraper = instance
+        warmup_state['status'] = 'ready'
+        print("浏览器已就绪")
+    except Exception as e:
+        warmup_state['status'] = 'failed'
+        warmup_state['error'] = str(e)
+        print(f"启动浏览器失败: {e}")
+
+def require_scraper():
+    """获取已就绪的scraper，浏览器仍在启动时返回503"""
+    if scraper:
+        return scraper
+    if warmup_state['status'] == 'starting':
+        raise HTTPException(status_code=503, detail="浏览器正在启动，请稍后重试")
+    raise HTTPException(status_code=500, detail="Scraper未初始化")
+
 @app.on_event("startup")
 async def startup_event():
-    global scraper
-    scraper = XiaohongshuScraper()
-    print("启动浏览器...")
+    global image_pipeline, warmup_thread, cluster, watcher
+    watcher = NoteWatcher(full_scrape=scrape_changed_note).start()
+    if SCRAPE_WORKERS > 0:
+        # 工作进程各自启动浏览器和图片后处理进程池，启动前提交的任务会排队等待
+        cluster = ScrapeCluster(SCRAPE_WORKERS).start()
+        return
+    image_pipeline = ImagePipeline.from_env()
+    # 不阻塞启动，服务可以立即响应 /ready 和其他不需要浏览器的接口
+    warmup_thread = threading.Thread(target=warm_up_scraper, name="browser-warmup", daemon=True)
+    warmup_thread.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     global scraper
+    if watcher:
+        watcher.stop()
+    if cluster:
+        cluster.close()
+        print("工作进程已关闭")
+    if warmup_thread:
+        warmup_thread.join(timeout=30)
     if scraper:
         scraper.close()
         print("浏览器已关闭")
+    if image_pipeline:
+        image_pipeline.close()
+    get_store().close()
 
-def save_to_file(data, filename='xiaohongshu_content.json'):
-    """将抓取的数据保存到JSON文件"""
+def save_to_file(data):
+    """将抓取的数据追加到本地结果库，返回数据库文件路径"""
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-        return filename
+        store = get_store()
+        store.add(data)
+        return store.path
     except Exception as e:
-        print(f"保存文件时出错: {e}")
+        print(f"保存结果时出错: {e}")
         return None
 
+def run_locked(func, *args):
+    """单浏览器模式下排队操作浏览器（抓取、登录），会阻塞，需要在线程池中调用"""
+    if not scrape_lock.acquire(timeout=SCRAPE_TIMEOUT):
+        raise TimeoutError("等待浏览器空闲超时")
+    try:
+        return func(*args)
+    finally:
+        scrape_lock.release()
+
+def scrape_changed_note(url):
+    """监控发现笔记内容变化时运行完整抓取，失败时抛出异常，下次检查时重试"""
+    if cluster:
+        result = cluster.submit_scrape(url).result(SCRAPE_TIMEOUT)
+    else:
+        result = run_locked(require_scraper().scrape_post, url)
+    if not result:
+        raise RuntimeError(f"无法抓取内容: {url}")
+    save_to_file(dict(result, url=url))
+    return result
+
 @app.post("/scrape/", response_model=ScrapeResponse)
 async def scrape_post(request: ScrapeRequest, background_tasks: BackgroundTasks):
-    global scraper
-    
-    if not scraper:
-        raise HTTPException(status_code=500, detail="Scraper未初始化")
+    if not cluster:
+        scraper = require_scraper()
     
     # 尝试提取URL
     url = request.url
@@ -65,39 +153,132 @@ async def scrape_post(request: ScrapeRequest, background_tasks: BackgroundTasks)
         url = 'https://' + url
     
     print(f"开始抓取内容: {url}")
-    result = scraper.scrape_post(url)
+    if cluster:
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(cluster.submit_scrape(url, request.image_variant)),
+                                            SCRAPE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="抓取超时")
+        except WorkerCrashed as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    else:
+        # 等待锁和浏览器操作都会阻塞，放到线程池中执行，不占用事件循环
+        try:
+            result = await run_in_threadpool(run_locked, scraper.scrape_post, url, request.image_variant)
+        except TimeoutError as e:
+            raise HTTPException(status_code=504, detail=str(e))
     
     if not result:
         raise HTTPException(status_code=404, detail="无法抓取内容，请检查URL是否正确")
     
     response = ScrapeResponse(
         title=result['title'],
+        author=result.get('author'),
         content=result['content'],
         image_urls=result['image_urls'],
         downloaded_files=result['downloaded_files'],
+        video_url=result.get('video_url'),
+        video_file=result.get('video_file'),
+        media_urls=[media_url(path) for path in result['downloaded_files'] + [result.get('video_file')] if path],
         output_dir=result['output_dir']
     )
     
-    if request.save_metadata:
-        metadata_path = save_to_file(result)
-        if metadata_path:
-            response.saved_metadata_path = metadata_path
+    # 每次抓取结果都追加到结果库，之后可以通过 /results/ 直接查询
+    metadata_path = save_to_file(dict(result, url=url))
+    if request.save_metadata and metadata_path:
+        response.saved_metadata_path = metadata_path
     
     return response
 
-@app.post("/login/")
-async def login():
-    global scraper
+@app.get("/results/")
+async def query_results(note_id: Optional[str] = None, short_url: Optional[str] = None,
+                        author: Optional[str] = None, since: Optional[float] = None,
+                        until: Optional[float] = None, limit: int = 50):
+    """
+    查询本地结果库中已保存的抓取结果，按抓取时间倒序返回，不会访问小红书
+    
+    - **since** / **until**: 抓取时间范围（Unix时间戳）
+    """
+    limit = max(1, min(limit, 500))
+    return get_store().query(note_id=note_id, short_url=short_url, author=author,
+                             since=since, until=until, limit=limit)
+
+@app.post("/watch/")
+async def add_watch(request: WatchRequest):
+    """
+    监控笔记或作者的更新
     
-    if not scraper:
-        raise HTTPException(status_code=500, detail="Scraper未初始化")
+    - **url**: 笔记链接（支持分享文本和短链接）或作者主页链接
+    - **interval**: 初始检查间隔（秒），之后根据内容变化频率自动调整
     
-    success = scraper.login()
+    到期时只做HTTP元数据提取，内容指纹变化的笔记才会用浏览器完整抓取并下载图片
+    """
+    try:
+        # 短链接需要联网跟踪重定向
+        return await run_in_threadpool(watcher.add, request.url, request.interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/watch/")
+async def list_watches(kind: Optional[Literal['note', 'author']] = None):
+    """列出所有监控项，按下次检查时间排序"""
+    return watcher.list_watches(kind)
+
+@app.delete("/watch/{kind}/{key}")
+async def remove_watch(kind: Literal['note', 'author'], key: str):
+    if not watcher.remove(kind, key):
+        raise HTTPException(status_code=404, detail="监控项不存在")
+    return {"message": "已取消监控"}
+
+@app.api_route("/media/{path:path}", methods=["GET", "HEAD"])
+async def serve_media(path: str, request: Request):
+    """
+    直接分发已下载的图片和视频
+    
+    支持Range请求和ETag，客户端重复请求时返回304
+    """
+    return media_response(request, resolve_media_path(path))
+
+@app.post("/login/")
+async def login():
+    if cluster:
+        # 在一个工作进程中登录，其他进程通过共享的cookie文件获得登录状态
+        try:
+            success = await asyncio.wait_for(asyncio.wrap_future(cluster.submit_login()), SCRAPE_TIMEOUT)
+        except (asyncio.TimeoutError, WorkerCrashed, RuntimeError):
+            success = False
+    else:
+        # 登录同样操作浏览器，与抓取共用锁，并在线程池中执行
+        try:
+            success = await run_in_threadpool(run_locked, require_scraper().login)
+        except TimeoutError as e:
+            raise HTTPException(status_code=504, detail=str(e))
     if not success:
         raise HTTPException(status_code=401, detail="登录失败")
     
     return {"message": "登录成功"}
 
+@app.get("/ready")
+async def readiness():
+    """
+    就绪检查，供负载均衡器使用
+    
+    浏览器启动并完成首次导航后返回200，否则返回503
+    """
+    if cluster:
+        status = cluster.status()
+        warm_browsers = status['ready']
+        body = {"ready": warm_browsers > 0, "status": "ready" if warm_browsers else "starting",
+                "warm_browsers": warm_browsers, "workers": status}
+        return JSONResponse(body, status_code=200 if warm_browsers else 503)
+    warm_browsers = 1 if scraper else 0
+    body = {"ready": warm_browsers > 0, "status": warmup_state['status'], "warm_browsers": warm_browsers}
+    if warmup_state['error']:
+        body["error"] = warmup_state['error']
+    return JSONResponse(body, status_code=200 if warm_browsers else 503)
+
 @app.get("/")
 async def read_root():
     return {"message": "小红书内容抓取API", "version": "1.0"}
@@ -0,0 +1,51 @@
+"""
+入口模块的导入耗时分析（基于 python -X importtime）
+
+用法:
+    python bench_import_time.py api --top 15
+"""
+import argparse
+import subprocess
+import sys
+
+
+def measure_imports(module, code=None):
+    """
+    在新的解释器中导入模块并解析 -X importtime 的输出
+
+    Args:
+        module (str): 要导入的模块名
+        code (str): 导入后额外执行的代码，可以用来确认某些调用不会触发更多导入
+
+    Returns:
+        dict: 顶层模块名 -> (自身耗时, 累计耗时)，单位为微秒
+    """
+    source = f"import {module}"
+    if code:
+        source += f"\n{code}"
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', source],
+                               capture_output=True, text=True, check=True)
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="分析模块的导入耗时")
+    parser.add_argument('module', nargs='?', default='api', help="要分析的模块，默认是 Vercel 入口 api")
+    parser.add_argument('--top', type=int, default=15, help="显示累计耗时最长的前N个模块")
+    args = parser.parse_args(argv)
+
+    timings = measure_imports(args.module)
+    total = timings.get(args.module, (0, 0))[1]
+    print(f"import {args.module}: {total / 1000:.1f} ms，共导入 {len(timings)} 个模块")
+    for name, (self_us, cumulative_us) in sorted(timings.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"{cumulative_us / 1000:10.1f} ms  {self_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
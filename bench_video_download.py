@@ -0,0 +1,138 @@
+"""
+视频下载吞吐量对比：单连接流式下载 vs 分段并行下载
+
+在本地启动一个支持Range请求的HTTP服务器，并对每个连接限速以模拟CDN的单连接带宽上限，
+分别用图片下载器同样的 iter_content(8192) 单连接循环和 xhs_video.download_video 下载同一个文件。
+
+用法:
+    python bench_video_download.py --size-mb 64 --per-connection-mbps 8 --workers 8
+"""
+import argparse
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from xhs_video import download_video
+
+
+_RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """支持Range请求的静态文件服务，server.file_path为文件路径，server.rate_limit为单连接限速（字节/秒）"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = self.server.file_path
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = _RANGE_RE.fullmatch(self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        length = end - start + 1
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+
+        rate_limit = getattr(self.server, 'rate_limit', None)
+        started = time.perf_counter()
+        sent = 0
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while sent < length:
+                chunk = f.read(min(64 * 1024, length - sent))
+                if not chunk:
+                    break
+                try:
+                    self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                sent += len(chunk)
+                if rate_limit:
+                    # 按单连接带宽上限节流
+                    delay = sent / rate_limit - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_range_server(file_path, rate_limit=None):
+    """启动本地Range服务器，返回 (server, base_url)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeRequestHandler)
+    server.daemon_threads = True
+    server.file_path = file_path
+    server.rate_limit = rate_limit
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/video.mp4"
+
+
+def single_stream_download(url, path):
+    """与 XiaohongshuScraper.download_image 相同的单连接下载方式"""
+    response = requests.get(url, stream=True)
+    response.raise_for_status()
+    with open(path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=8192):
+            if chunk:
+                f.write(chunk)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对比单连接下载与分段并行下载的吞吐量")
+    parser.add_argument('--size-mb', type=int, default=64, help="测试文件大小（MB）")
+    parser.add_argument('--per-connection-mbps', type=float, default=8.0, help="单连接限速（MB/s），0表示不限速")
+    parser.add_argument('--workers', type=int, default=8, help="并行连接数")
+    parser.add_argument('--segment-mb', type=int, default=4, help="每段大小（MB）")
+    args = parser.parse_args(argv)
+
+    size = args.size_mb * 1024 * 1024
+    rate_limit = args.per_connection_mbps * 1024 * 1024 if args.per_connection_mbps else None
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.mp4')
+        with open(source, 'wb') as f:
+            f.write(os.urandom(size))
+        server, url = start_range_server(source, rate_limit)
+        try:
+            results = {}
+            for name, fn in (
+                ('单连接', lambda target: single_stream_download(url, target)),
+                (f'分段并行({args.workers}连接)', lambda target: download_video(
+                    url, target, workers=args.workers, segment_size=args.segment_mb * 1024 * 1024,
+                    session=requests.Session())),
+            ):
+                target = os.path.join(tmp, 'download.mp4')
+                started = time.perf_counter()
+                fn(target)
+                elapsed = time.perf_counter() - started
+                assert os.path.getsize(target) == size
+                os.remove(target)
+                results[name] = size / (1024 * 1024) / elapsed
+                print(f"{name}: {elapsed:.2f} 秒，{results[name]:.1f} MB/s")
+            baseline, parallel = results.values()
+            print(f"加速比: {parallel / baseline:.1f}x")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
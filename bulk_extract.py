@@ -0,0 +1,216 @@
+"""
+批量提取小红书分享文本的命令行工具
+
+从文件或标准输入逐行读取分享文本，并发调用现有的提取逻辑，每完成一条就向JSONL文件追加一行结果，
+同时维护检查点文件，中断后重新运行同一命令即可从上次停止的位置继续。
+
+用法:
+    python bulk_extract.py shares.txt -o results.jsonl --workers 16
+    cat shares.txt | python bulk_extract.py - -o results.jsonl --extractor transform
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Checkpoint:
+    """
+    记录已完成的输入行号
+
+    watermark之前的行全部完成；done只保存watermark之后乱序完成的行号，
+    由于提交窗口有上限，done的大小不会随输入增长。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.watermark = 0
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.watermark = state.get('watermark', 0)
+            self.done = set(state.get('done', []))
+
+    def is_done(self, index):
+        return index < self.watermark or index in self.done
+
+    def mark(self, index):
+        self.done.add(index)
+        while self.watermark in self.done:
+            self.done.discard(self.watermark)
+            self.watermark += 1
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'watermark': self.watermark, 'done': sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def extract_with_metadata_api(text):
+    """使用 xhs_metadata_api 的提取流程（短链接 -> 重定向 -> meta标签）"""
+    from fastapi import HTTPException
+    from xhs_metadata_api import extract_xiaohongshu_url, follow_redirect, extract_metadata
+
+    short_url = extract_xiaohongshu_url(text)
+    if not short_url:
+        raise ValueError("未能从输入文本中提取到有效的小红书链接")
+    try:
+        final_url = follow_redirect(short_url)
+        metadata = extract_metadata(final_url)
+    except HTTPException as e:
+        raise ValueError(e.detail)
+    return {
+        'title': metadata['title'],
+        'description': metadata['description'],
+        'image_urls': metadata['image_urls'],
+        'original_url': short_url,
+        'extracted_url': final_url,
+    }
+
+
+def extract_with_transform(text):
+    """使用 transform_xhs 的提取流程"""
+    from transform_xhs import extract_xhs_content
+
+    result = extract_xhs_content(text)
+    if not result:
+        raise ValueError("Failed to extract content")
+    if "error" in result:
+        raise ValueError(result["error"])
+    return result
+
+
+EXTRACTORS = {
+    'metadata': extract_with_metadata_api,
+    'transform': extract_with_transform,
+}
+
+
+def _process(index, text, extract_fn):
+    try:
+        return {'line': index, 'input': text, 'ok': True, 'result': extract_fn(text)}
+    except Exception as e:
+        return {'line': index, 'input': text, 'ok': False, 'error': str(e)}
+
+
+def run(lines, output_path, checkpoint_path, extract_fn, workers=8, limit=None,
+        checkpoint_every=100, checkpoint_interval=5.0, progress=None):
+    """
+    并发处理输入行，按完成顺序写出JSONL结果
+
+    Args:
+        lines (Iterable[str]): 输入文本，每行一条
+        output_path (str): 结果JSONL文件（追加写入）
+        checkpoint_path (str): 检查点文件
+        extract_fn (Callable[[str], dict]): 单条提取函数，失败时抛出异常
+        workers (int): 并发数
+        limit (int): 本次最多处理的条数，None表示不限制
+        checkpoint_every (int): 每完成多少条保存一次检查点
+        checkpoint_interval (float): 两次保存检查点的最长间隔（秒）
+        progress (Callable[[dict], None]): 进度回调
+
+    Returns:
+        dict: 本次运行的统计信息
+    """
+    checkpoint = Checkpoint(checkpoint_path)
+    max_pending = workers * 4
+    # 提交位置最多领先watermark这么多行，保证检查点大小有上限
+    max_window = workers * 64
+    stats = {'processed': 0, 'ok': 0, 'failed': 0, 'skipped': 0}
+    started = time.monotonic()
+    last_saved = started
+    unsaved = 0
+
+    def drain(pending):
+        nonlocal last_saved, unsaved
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            checkpoint.mark(record['line'])
+            stats['processed'] += 1
+            stats['ok' if record['ok'] else 'failed'] += 1
+            unsaved += 1
+        if unsaved >= checkpoint_every or time.monotonic() - last_saved >= checkpoint_interval:
+            out.flush()
+            checkpoint.save()
+            last_saved = time.monotonic()
+            unsaved = 0
+            if progress:
+                progress(dict(stats, elapsed=last_saved - started))
+        return pending
+
+    with open(output_path, 'a', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        submitted = 0
+        try:
+            for index, line in enumerate(lines):
+                if checkpoint.is_done(index):
+                    continue
+                text = line.strip()
+                if not text:
+                    # 空行不产生结果，但要推进watermark
+                    checkpoint.mark(index)
+                    stats['skipped'] += 1
+                    continue
+                if limit is not None and submitted >= limit:
+                    break
+                while len(pending) >= max_pending or (pending and index - checkpoint.watermark >= max_window):
+                    pending = drain(pending)
+                pending.add(executor.submit(_process, index, text, extract_fn))
+                submitted += 1
+            while pending:
+                pending = drain(pending)
+        finally:
+            # 中断时也把已经完成的结果和检查点落盘
+            for future in pending:
+                future.cancel()
+            pending = {future for future in pending if not future.cancelled()}
+            while pending:
+                pending = drain(pending)
+            out.flush()
+            checkpoint.save()
+
+    stats['elapsed'] = time.monotonic() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量提取小红书分享文本，结果以JSONL格式逐行写出")
+    parser.add_argument('input', help="输入文件路径，每行一条分享文本；使用 - 表示标准输入")
+    parser.add_argument('-o', '--output', required=True, help="结果JSONL文件路径（追加写入）")
+    parser.add_argument('--checkpoint', help="检查点文件路径，默认为 <output>.checkpoint")
+    parser.add_argument('--workers', type=int, default=8, help="并发数")
+    parser.add_argument('--extractor', choices=sorted(EXTRACTORS), default='metadata', help="使用的提取逻辑")
+    parser.add_argument('--limit', type=int, help="本次最多处理的条数")
+    args = parser.parse_args(argv)
+    # transform_xhs 通过logging输出错误，不再在导入时配置
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    checkpoint_path = args.checkpoint or args.output + '.checkpoint'
+
+    def report(stats):
+        rate = stats['processed'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        print(f"已处理 {stats['processed']} 条（成功 {stats['ok']}，失败 {stats['failed']}），{rate:.1f} 条/秒",
+              file=sys.stderr)
+
+    if args.input == '-':
+        lines = sys.stdin
+        stats = run(lines, args.output, checkpoint_path, EXTRACTORS[args.extractor],
+                    workers=args.workers, limit=args.limit, progress=report)
+    else:
+        with open(args.input, 'r', encoding='utf-8') as lines:
+            stats = run(lines, args.output, checkpoint_path, EXTRACTORS[args.extractor],
+                        workers=args.workers, limit=args.limit, progress=report)
+    report(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+登录cookies的内存存储
+
+xiaohongshu_cookies.json 只在首次使用（或被其他进程更新）时读取一次，并记录cookies的过期时间。
+浏览器和HTTP客户端都从这里获取cookies：浏览器登录后写回这里，HTTP请求直接复用，
+只有在cookies过期或被判定失效时才需要重新从浏览器会话刷新。
+"""
+import json
+import os
+import threading
+import time
+
+
+DEFAULT_COOKIES_PATH = 'xiaohongshu_cookies.json'
+
+# 提前这么多秒视为过期，避免请求途中失效
+EXPIRY_MARGIN = 60
+
+XHS_HOME_URL = 'https://www.xiaohongshu.com'
+
+
+class CookieStore:
+    """
+    Args:
+        path (str): cookies文件路径，格式与 driver.get_cookies() 相同
+    """
+
+    def __init__(self, path=DEFAULT_COOKIES_PATH):
+        self.path = path
+        self._cookies = []
+        self._mtime = None
+        self._stale = False
+        self._lock = threading.RLock()
+        # 每次cookies变化时递增，HTTP客户端据此判断是否需要重新同步
+        self.version = 0
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                cookies = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"加载cookies时出错: {str(e)}")
+            return
+        self._cookies = cookies
+        self._mtime = mtime
+        self._stale = False
+        self.version += 1
+
+    @property
+    def cookies(self):
+        with self._lock:
+            self._reload_if_changed()
+            return list(self._cookies)
+
+    def expires_at(self):
+        """最早过期的cookie的过期时间（Unix时间戳），只有会话cookie时返回None"""
+        expiries = [cookie['expiry'] for cookie in self.cookies if cookie.get('expiry')]
+        return min(expiries) if expiries else None
+
+    def is_valid(self, now=None):
+        """是否有可用（未过期、未被判定失效）的登录cookies"""
+        with self._lock:
+            self._reload_if_changed()
+            if not self._cookies or self._stale:
+                return False
+            expires_at = self.expires_at()
+            now = now if now is not None else time.time()
+            return expires_at is None or expires_at > now + EXPIRY_MARGIN
+
+    def mark_stale(self):
+        """上游提示需要登录时调用，下次使用浏览器时会重新刷新"""
+        with self._lock:
+            if not self._stale:
+                self._stale = True
+                self.version += 1
+
+    def save(self, cookies):
+        """更新cookies并原子写入文件"""
+        with self._lock:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(cookies, f)
+            os.replace(tmp_path, self.path)
+            self._cookies = list(cookies)
+            self._mtime = os.path.getmtime(self.path)
+            self._stale = False
+            self.version += 1
+
+    def save_from_driver(self, driver):
+        """从浏览器会话刷新cookies"""
+        self.save(driver.get_cookies())
+
+    def apply_to_driver(self, driver):
+        """
+        把cookies写入浏览器
+
+        Returns:
+            bool: 是否有可用的cookies
+        """
+        if not self.is_valid():
+            return False
+        # 浏览器只接受当前域名下的cookie
+        if 'xiaohongshu.com' not in (driver.current_url or ''):
+            driver.get(XHS_HOME_URL)
+        for cookie in self.cookies:
+            driver.add_cookie(cookie)
+        return True
+
+    def apply_to_session(self, session):
+        """把cookies写入requests.Session，失效时清空"""
+        session.cookies.clear()
+        if not self.is_valid():
+            return False
+        for cookie in self.cookies:
+            session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain', '.xiaohongshu.com'),
+                path=cookie.get('path', '/'),
+                expires=cookie.get('expiry'),
+                secure=cookie.get('secure', False),
+            )
+        return True
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_cookie_store():
+    """进程内共享的默认cookies存储"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = CookieStore()
+        return _default_store
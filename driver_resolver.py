@@ -0,0 +1,110 @@
+"""
+chromedriver路径解析（带缓存，可离线使用）
+
+原来每次创建 XiaohongshuScraper 都会调用 ChromeDriverManager().install()，联网检查并可能下载驱动。
+这里按以下顺序解析，只有在前面都找不到时才联网下载，并把结果缓存到文件中：
+
+1. 环境变量 CHROMEDRIVER_PATH 指定的路径
+2. 缓存文件中记录的路径（与 CHROMEDRIVER_VERSION 一致且文件仍然存在；未固定版本时与本机Chrome的主版本号一致）
+3. PATH 中的 chromedriver（未固定版本时）
+4. ChromeDriverManager 下载（CHROMEDRIVER_VERSION 固定版本，未设置时为最新版）
+
+同一进程内只解析一次。
+"""
+import functools
+import json
+import os
+import re
+import shutil
+import subprocess
+
+
+DRIVER_CACHE_FILE = os.environ.get('XHS_CHROMEDRIVER_CACHE', '.chromedriver.json')
+
+_CHROME_BINARIES = (
+    'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+)
+
+
+def _is_executable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def installed_chrome_major():
+    """本机Chrome的主版本号，无法确定时返回None"""
+    for binary in _CHROME_BINARIES:
+        path = shutil.which(binary) or (binary if os.path.isfile(binary) else None)
+        if not path:
+            continue
+        try:
+            output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = re.search(r'(\d+)\.\d+\.\d+', output)
+        if match:
+            return match.group(1)
+    return None
+
+
+def _cache_key(version):
+    """缓存键：固定的驱动版本；未固定时为Chrome主版本号（Chrome自动更新后缓存失效），无法确定时不使用缓存"""
+    if version:
+        return version
+    major = installed_chrome_major()
+    return f"chrome-{major}" if major else None
+
+
+def _read_cache(cache_file, version):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('version') != version or not _is_executable(cached.get('path')):
+        return None
+    return cached['path']
+
+
+def _write_cache(cache_file, version, path):
+    tmp_path = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'path': path}, f)
+        os.replace(tmp_path, cache_file)
+    except OSError as e:
+        print(f"写入chromedriver缓存时出错: {e}")
+
+
+@functools.lru_cache(maxsize=1)
+def resolve_chromedriver():
+    """
+    解析chromedriver可执行文件路径
+
+    Returns:
+        str: chromedriver路径
+    """
+    env_path = os.environ.get('CHROMEDRIVER_PATH')
+    if env_path:
+        if not _is_executable(env_path):
+            raise RuntimeError(f"CHROMEDRIVER_PATH 指定的文件不可执行: {env_path}")
+        return env_path
+
+    version = os.environ.get('CHROMEDRIVER_VERSION') or None
+    cache_key = _cache_key(version)
+    cached = _read_cache(DRIVER_CACHE_FILE, cache_key) if cache_key else None
+    if cached:
+        return cached
+
+    if version is None:
+        system_path = shutil.which('chromedriver')
+        if system_path:
+            return system_path
+
+    # 只有找不到本地驱动时才联网
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    path = ChromeDriverManager(driver_version=version).install()
+    if cache_key:
+        _write_cache(DRIVER_CACHE_FILE, cache_key, path)
+    return path
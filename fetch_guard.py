@@ -0,0 +1,226 @@
+"""
+上游请求保护：失败链接的负缓存 + 按主机的熔断器
+
+- 负缓存：笔记已删除、短链接过期、需要登录等确定性失败，在短时间内直接返回缓存的错误，
+  不再重复跟踪重定向和抓取页面。
+- 熔断器：某个主机持续出错（连接失败、超时、5xx）时快速失败，冷却后进入半开状态放行少量探测请求。
+"""
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+
+# 确定性失败的HTTP状态码：重试也不会成功
+DETERMINISTIC_STATUS_CODES = {400, 401, 403, 404, 410}
+
+# 需要登录时小红书会跳转到的页面特征
+LOGIN_URL_MARKERS = ('/login', 'website-login', 'redirectPath=')
+
+
+class FetchRejected(Exception):
+    """请求在发出之前被负缓存或熔断器拒绝"""
+
+    def __init__(self, detail, status_code=500):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class LoginRequiredError(Exception):
+    """页面被重定向到登录页"""
+
+
+def is_login_redirect(url):
+    """判断最终URL是否为登录页"""
+    return bool(url) and any(marker in url for marker in LOGIN_URL_MARKERS)
+
+
+def is_deterministic_failure(exc):
+    """
+    判断异常是否为确定性失败（应进入负缓存，而不是计入熔断器）
+
+    Args:
+        exc (Exception): 请求过程中抛出的异常
+
+    Returns:
+        bool: 确定性失败返回True
+    """
+    if isinstance(exc, LoginRequiredError):
+        return True
+    response = getattr(exc, 'response', None)
+    status_code = getattr(response, 'status_code', None)
+    return status_code in DETERMINISTIC_STATUS_CODES
+
+
+class NegativeCache:
+    """带TTL的失败结果缓存，超过容量时淘汰最早的条目"""
+
+    def __init__(self, ttl=300.0, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        查询缓存的失败结果
+
+        Returns:
+            tuple: (status_code, detail)，未命中或已过期返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, status_code, detail = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return status_code, detail
+
+    def add(self, key, detail, status_code=500):
+        """记录一次确定性失败"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, status_code, detail)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CircuitBreaker:
+    """
+    单个主机的熔断器
+
+    closed: 正常放行，连续失败达到阈值后进入open
+    open: 直接拒绝，经过recovery_timeout后进入half_open
+    half_open: 最多放行half_open_max_calls个探测请求，成功则closed，失败则重新open
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+
+    def allow_request(self):
+        """是否放行本次请求"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_calls = 0
+
+
+class FetchGuard:
+    """组合负缓存与按主机熔断器，供各个抓取入口共享"""
+
+    def __init__(self, negative_ttl=300.0, failure_threshold=5, recovery_timeout=30.0):
+        self.negative_cache = NegativeCache(ttl=negative_ttl)
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker_for(self, url):
+        """获取URL所属主机的熔断器"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+                self._breakers[host] = breaker
+            return breaker
+
+    def check(self, url):
+        """
+        在发出请求之前检查，命中负缓存或熔断器打开时抛出FetchRejected
+
+        Args:
+            url (str): 即将请求的URL
+        """
+        cached = self.negative_cache.get(url)
+        if cached is not None:
+            status_code, detail = cached
+            raise FetchRejected(detail, status_code)
+        if not self.breaker_for(url).allow_request():
+            host = urlparse(url).netloc
+            raise FetchRejected(f"上游主机 {host} 暂时不可用，请稍后重试", 503)
+
+    def record_success(self, url):
+        self.breaker_for(url).record_success()
+
+    def record_failure(self, url, detail, deterministic, status_code=500):
+        """
+        记录一次失败
+
+        Args:
+            url (str): 失败的URL
+            detail (str): 返回给调用方的错误信息
+            deterministic (bool): 是否为确定性失败
+            status_code (int): 命中负缓存时返回的状态码
+        """
+        if deterministic:
+            # 主机本身是正常的，只是这条链接不可用
+            self.negative_cache.add(url, detail, status_code)
+            self.breaker_for(url).record_success()
+        else:
+            self.breaker_for(url).record_failure()
+
+    def alias_failure(self, alias, url):
+        """把url的负缓存条目同步给alias（例如短链接）"""
+        cached = self.negative_cache.get(url)
+        if cached is not None:
+            status_code, detail = cached
+            self.negative_cache.add(alias, detail, status_code)
+
+
+# 进程内共享的默认实例
+guard = FetchGuard()
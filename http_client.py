@@ -0,0 +1,109 @@
+"""
+共享的HTTP连接池
+
+各个基于requests的提取流程共用同一个Session，复用TCP/TLS连接，
+并自动带上 cookie_store 中的登录cookies，让需要登录的笔记也能走HTTP快速路径。
+
+设置环境变量 XHS_MOCK_UPSTREAM（例如 http://127.0.0.1:9000）后，发往小红书域名
+（xiaohongshu.com、xhslink.com、xhscdn.com）的请求会改写到 mock_xhs_server.py 启动的
+本地模拟服务器，用于压测，不访问真实网站。
+"""
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cookie_store import get_cookie_store
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+POOL_SIZE = 32
+
+MOCK_HOST_SUFFIXES = ('xiaohongshu.com', 'xhslink.com', 'xhscdn.com')
+MOCK_PATH_PREFIX = '/_host/'
+
+_session = None
+_cookie_version = None
+_lock = threading.Lock()
+
+
+def mock_upstream():
+    """模拟服务器地址，未启用时返回None"""
+    return os.environ.get('XHS_MOCK_UPSTREAM', '').rstrip('/') or None
+
+
+def _is_xhs_host(host):
+    return any(host == suffix or host.endswith('.' + suffix) for suffix in MOCK_HOST_SUFFIXES)
+
+
+def upstream_url(url):
+    """
+    启用模拟服务器时把小红书URL改写为模拟服务器地址，否则原样返回
+
+    例如 https://www.xiaohongshu.com/explore/abc -> http://127.0.0.1:9000/_host/www.xiaohongshu.com/explore/abc
+    """
+    base = mock_upstream()
+    if not base:
+        return url
+    parts = urlsplit(url)
+    if not _is_xhs_host(parts.hostname or ''):
+        return url
+    query = f"?{parts.query}" if parts.query else ''
+    return f"{base}{MOCK_PATH_PREFIX}{parts.netloc}{parts.path or '/'}{query}"
+
+
+def original_url(url):
+    """upstream_url 的逆变换，把模拟服务器地址还原为小红书URL"""
+    base = mock_upstream()
+    if not base or not url.startswith(base + MOCK_PATH_PREFIX):
+        return url
+    return 'https://' + url[len(base + MOCK_PATH_PREFIX):]
+
+
+class MockUpstreamAdapter(HTTPAdapter):
+    """把请求改写到模拟服务器，并把响应的URL还原，调用方看到的仍然是小红书URL"""
+
+    def send(self, request, **kwargs):
+        request.url = upstream_url(request.url)
+        request.headers['X-Mock-Client'] = 'requests'
+        response = super().send(request, **kwargs)
+        response.url = original_url(response.url)
+        return response
+
+
+def _create_session():
+    session = requests.Session()
+    adapter_class = MockUpstreamAdapter if mock_upstream() else HTTPAdapter
+    adapter = adapter_class(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def get_session():
+    """
+    获取共享的Session
+
+    cookies更新（浏览器重新登录、其他进程写入文件）后会自动同步到Session。
+
+    Returns:
+        requests.Session: 共享的Session
+    """
+    global _session, _cookie_version
+    store = get_cookie_store()
+    with _lock:
+        if _session is None:
+            _session = _create_session()
+        # is_valid会在文件变化时重新加载，需要先调用再比较版本
+        store.is_valid()
+        if store.version != _cookie_version:
+            store.apply_to_session(_session)
+            _cookie_version = store.version
+        return _session
@@ -0,0 +1,194 @@
+"""
+图片下载后的并行后处理（可选，需要安装Pillow）
+
+每张图片下载完成后立即提交到进程池：只解码一次，生成配置的缩略图尺寸和格式（JPEG/WebP），
+计算感知哈希（dHash），并把尺寸等信息写入该笔记目录下的 manifest.json。
+CPU密集的图片处理在独立进程中执行，不会阻塞抓取流程。
+
+启用方式（app.py）:
+    XHS_IMAGE_PIPELINE=1 XHS_THUMBNAIL_SIZES=360,720 XHS_IMAGE_FORMATS=jpeg,webp uvicorn app:app
+"""
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow是可选依赖
+    Image = None
+
+
+MANIFEST_FILENAME = 'manifest.json'
+THUMBNAIL_DIRNAME = 'thumbnails'
+
+_FORMAT_EXTENSIONS = {'jpeg': '.jpg', 'webp': '.webp', 'png': '.png'}
+
+
+def _dhash(image, hash_size=8):
+    """差值哈希：缩放为 (hash_size+1) x hash_size 的灰度图，比较相邻像素"""
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def process_image(path, thumbnail_sizes, formats, quality=85):
+    """
+    处理单张图片（在工作进程中执行）
+
+    Args:
+        path (str): 已下载的图片路径
+        thumbnail_sizes (tuple): 缩略图最长边的像素数
+        formats (tuple): 输出格式，jpeg / webp / png
+        quality (int): 有损格式的压缩质量
+
+    Returns:
+        dict: 图片尺寸、感知哈希和生成的文件列表
+    """
+    filename = os.path.basename(path)
+    stem = os.path.splitext(filename)[0]
+    thumbnail_dir = os.path.join(os.path.dirname(path), THUMBNAIL_DIRNAME)
+    os.makedirs(thumbnail_dir, exist_ok=True)
+
+    with Image.open(path) as image:
+        image.load()
+        width, height = image.size
+        source_format = image.format
+        # 只解码一次，后续所有输出都基于同一份RGB数据
+        rgb = image.convert('RGB')
+
+    outputs = []
+    for size in thumbnail_sizes:
+        thumbnail = rgb.copy()
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        for fmt in formats:
+            out_path = os.path.join(thumbnail_dir, f"{stem}_{size}{_FORMAT_EXTENSIONS[fmt]}")
+            thumbnail.save(out_path, fmt.upper(), quality=quality)
+            outputs.append({
+                'path': out_path,
+                'format': fmt,
+                'width': thumbnail.width,
+                'height': thumbnail.height,
+            })
+
+    return {
+        'file': filename,
+        'width': width,
+        'height': height,
+        'format': source_format,
+        'phash': _dhash(rgb),
+        'outputs': outputs,
+    }
+
+
+class NoteBatch:
+    """一条笔记的图片处理任务，全部完成后写入 manifest.json"""
+
+    def __init__(self, pipeline, output_dir):
+        self.pipeline = pipeline
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self._entries = []
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+    def add(self, filepath):
+        """图片下载完成后立即提交处理"""
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self.pipeline.submit(filepath)
+        except Exception as e:
+            # 进程池已关闭或损坏：记录错误，保证 manifest.json 仍然会写入
+            self._finish({'file': os.path.basename(filepath), 'error': str(e)})
+            return
+        future.add_done_callback(lambda f, path=filepath: self._on_done(path, f))
+
+    def _on_done(self, filepath, future):
+        try:
+            entry = future.result()
+        except Exception as e:
+            entry = {'file': os.path.basename(filepath), 'error': str(e)}
+        self._finish(entry)
+
+    def _finish(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            self._pending -= 1
+            finished = self._closed and self._pending == 0
+        if finished:
+            self._write_manifest()
+
+    def close(self):
+        """不再添加图片；不会阻塞，处理全部完成后自动写入 manifest.json"""
+        with self._lock:
+            self._closed = True
+            finished = self._pending == 0
+        if finished:
+            self._write_manifest()
+
+    def wait(self, timeout=None):
+        """等待 manifest.json 写入完成"""
+        return self._finished.wait(timeout)
+
+    def _write_manifest(self):
+        entries = sorted(self._entries, key=lambda entry: entry['file'])
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'images': entries}, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+        self._finished.set()
+
+
+class ImagePipeline:
+    """
+    图片后处理进程池
+
+    Args:
+        thumbnail_sizes (tuple): 缩略图最长边的像素数
+        formats (tuple): 输出格式，jpeg / webp / png
+        quality (int): 有损格式的压缩质量
+        workers (int): 进程数，默认使用全部CPU核心
+    """
+
+    def __init__(self, thumbnail_sizes=(360,), formats=('jpeg',), quality=85, workers=None):
+        if Image is None:
+            raise RuntimeError("图片后处理需要安装Pillow: pip install Pillow")
+        unknown = [fmt for fmt in formats if fmt not in _FORMAT_EXTENSIONS]
+        if unknown:
+            raise ValueError(f"不支持的图片格式: {', '.join(unknown)}")
+        self.thumbnail_sizes = tuple(thumbnail_sizes)
+        self.formats = tuple(formats)
+        self.quality = quality
+        # 使用spawn，避免在多线程的服务进程中fork
+        self._executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                             mp_context=multiprocessing.get_context('spawn'))
+
+    @classmethod
+    def from_env(cls, default_workers=None):
+        """根据环境变量创建，未启用时返回None；default_workers 为未设置 XHS_IMAGE_WORKERS 时的进程数"""
+        if os.environ.get('XHS_IMAGE_PIPELINE', '').lower() not in ('1', 'true', 'yes'):
+            return None
+        sizes = [int(size) for size in os.environ.get('XHS_THUMBNAIL_SIZES', '360').split(',') if size]
+        formats = [fmt.strip().lower() for fmt in os.environ.get('XHS_IMAGE_FORMATS', 'jpeg').split(',') if fmt.strip()]
+        workers = int(os.environ['XHS_IMAGE_WORKERS']) if os.environ.get('XHS_IMAGE_WORKERS') else default_workers
+        return cls(sizes, formats, workers=workers)
+
+    def submit(self, filepath):
+        return self._executor.submit(process_image, filepath, self.thumbnail_sizes, self.formats, self.quality)
+
+    def start_note(self, output_dir):
+        """开始处理一条笔记的图片"""
+        return NoteBatch(self, output_dir)
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,347 @@
+"""
+三个API服务的压测工具（配合 mock_xhs_server.py，不访问真实网站）
+
+按并发数逐级加压，报告每一级的吞吐量和 p50/p95/p99 延迟，结果保存为JSON，
+可以用 --compare 与之前的结果对比。
+
+用法:
+    # 自动启动模拟服务器和被测服务（在临时目录中运行，不影响本地结果库和cookies）
+    python load_test.py --endpoint extract/ --spawn --concurrency 1,4,16,64 --requests 400
+
+    # 压测已经在运行的服务（服务需要以 XHS_MOCK_UPSTREAM 指向模拟服务器的方式启动）
+    python load_test.py --endpoint scrape/ --base-url http://127.0.0.1:8000 --mock-url http://127.0.0.1:9000
+
+    # 与上一次的结果对比
+    python load_test.py --endpoint extract/ --spawn --compare load_results/extract-20250101-120000.json
+
+    # 多进程抓取的扩展性：依次以 XHS_SCRAPE_WORKERS=1,2,4 启动 app.py，比较峰值吞吐量
+    python load_test.py --endpoint scrape/ --spawn --cluster 1,2,4 --concurrency 1,2,4,8
+"""
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import mock_xhs_server
+
+
+# 端点 -> (被测服务, 请求路径, 构造请求体的函数)
+ENDPOINTS = {
+    'extract': ('api:app', '/extract', lambda link, args: {'url': link}),
+    'extract/': ('xhs_metadata_api:app', '/extract/',
+                 lambda link, args: {'input_text': f"分享一篇小红书笔记 {link}", 'refresh': not args.allow_cache}),
+    'scrape/': ('app:app', '/scrape/', lambda link, args: {'url': link}),
+}
+
+# 被测服务的就绪检查路径（app.py 需要等浏览器启动）
+READY_PATHS = {'app:app': '/ready'}
+
+
+def percentile(sorted_values, p):
+    """最近秩法计算百分位数"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(concurrency, samples, elapsed):
+    """
+    汇总一级压测的结果
+
+    Args:
+        concurrency (int): 并发数
+        samples (list): (延迟秒数, 状态码) 列表，连接失败时状态码为None
+        elapsed (float): 总耗时
+
+    Returns:
+        dict: 吞吐量、延迟分位数（毫秒）和错误统计
+    """
+    latencies = sorted(latency * 1000 for latency, status in samples if status == 200)
+    errors = Counter(str(status) for _, status in samples if status != 200)
+    summary = {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'ok': len(latencies),
+        'errors': dict(errors),
+        'elapsed': round(elapsed, 3),
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0,
+        'mean_ms': round(sum(latencies) / len(latencies), 1) if latencies else None,
+    }
+    for p in (50, 95, 99):
+        value = percentile(latencies, p)
+        summary[f'p{p}_ms'] = round(value, 1) if value is not None else None
+    return summary
+
+
+def run_level(url, payloads, concurrency, total, timeout=120):
+    """以固定并发发送total个请求，payloads循环使用"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    counter = iter(range(total))
+    counter_lock = threading.Lock()
+    samples = []
+
+    def worker():
+        local = []
+        while True:
+            with counter_lock:
+                index = next(counter, None)
+            if index is None:
+                return local
+            started = time.perf_counter()
+            try:
+                status = session.post(url, json=payloads[index % len(payloads)], timeout=timeout).status_code
+            except requests.RequestException:
+                status = None
+            local.append((time.perf_counter() - started, status))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for result in [executor.submit(worker) for _ in range(concurrency)]:
+            samples.extend(result.result())
+    elapsed = time.perf_counter() - started
+    session.close()
+    return summarize(concurrency, samples, elapsed)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"进程已退出（exitcode={process.returncode}）: {url}")
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"等待服务就绪超时: {url}")
+
+
+def spawn_services(app, mock_argv, workdir, ready_timeout=120, app_env=None):
+    """
+    在临时目录中启动模拟服务器和被测服务
+
+    Args:
+        app_env (dict): 被测服务额外的环境变量
+
+    Returns:
+        tuple: (进程列表, 被测服务地址, 模拟服务器地址)
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [repo_dir, os.environ.get('PYTHONPATH')])))
+    processes = []
+    try:
+        mock_port = _free_port()
+        mock_url = f"http://127.0.0.1:{mock_port}"
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.join(repo_dir, 'mock_xhs_server.py'), '--port', str(mock_port)] + mock_argv,
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL))
+        _wait_until_ready(f"{mock_url}/_stats", processes[-1], ready_timeout)
+
+        app_port = _free_port()
+        base_url = f"http://127.0.0.1:{app_port}"
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', app, '--port', str(app_port), '--log-level', 'warning'],
+            cwd=workdir, env=dict(env, XHS_MOCK_UPSTREAM=mock_url, **(app_env or {})), stdout=subprocess.DEVNULL))
+        _wait_until_ready(base_url + READY_PATHS.get(app, '/'), processes[-1], ready_timeout)
+        return processes, base_url, mock_url
+    except Exception:
+        stop_services(processes)
+        raise
+
+
+def stop_services(processes):
+    for process in reversed(processes):
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def mock_arguments(args):
+    """把模拟服务器相关的参数转换为 mock_xhs_server.py 的命令行参数"""
+    argv = ['--notes', str(args.notes), '--seed', str(args.seed),
+            '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+            '--error-rate', str(args.error_rate), '--rate-limit', str(args.rate_limit),
+            '--image-kb', str(args.image_kb), '--video-kb', str(args.video_kb)]
+    if args.burst:
+        argv += ['--burst', str(args.burst)]
+    if args.fixtures:
+        argv += ['--fixtures', os.path.abspath(args.fixtures)]
+    return argv
+
+
+def print_level(level):
+    errors = ', '.join(f"{status}: {count}" for status, count in sorted(level['errors'].items())) or '-'
+    print(f"{level['concurrency']:>6} {level['requests']:>6} {level['throughput']:>10.1f} "
+          f"{level['p50_ms'] or 0:>9.1f} {level['p95_ms'] or 0:>9.1f} {level['p99_ms'] or 0:>9.1f}  {errors}")
+
+
+def compare_results(current, previous):
+    """按并发数对比吞吐量和p95延迟"""
+    previous_levels = {level['concurrency']: level for level in previous['levels']}
+    print(f"\n与 {previous.get('started_at')} 的结果对比（{previous.get('git_commit') or '未知版本'}）:")
+    print(f"{'并发':>6} {'吞吐量变化':>12} {'p95变化':>12}")
+    for level in current['levels']:
+        old = previous_levels.get(level['concurrency'])
+        if not old:
+            continue
+
+        def change(key):
+            if not old.get(key) or level.get(key) is None:
+                return '-'
+            return f"{(level[key] - old[key]) / old[key] * 100:+.1f}%"
+
+        print(f"{level['concurrency']:>6} {change('throughput'):>12} {change('p95_ms'):>12}")
+
+
+def print_scaling(runs):
+    """
+    按工作进程数比较峰值吞吐量
+
+    Args:
+        runs (list): [{'workers': 工作进程数, 'levels': 各级结果}]
+    """
+    base = runs[0]
+    base_peak = max(level['throughput'] for level in base['levels']) if base['levels'] else 0
+    print(f"\n{'进程数':>6} {'峰值吞吐量/s':>12} {'加速比':>8} {'线性度':>8}")
+    for run in runs:
+        peak = max(level['throughput'] for level in run['levels']) if run['levels'] else 0
+        speedup = peak / base_peak if base_peak else 0
+        # 线性度：实际加速比 / 进程数之比，1.0 表示完全线性扩展
+        efficiency = speedup / (run['workers'] / base['workers'])
+        run['peak_throughput'] = peak
+        run['efficiency'] = round(efficiency, 3)
+        print(f"{run['workers']:>6} {peak:>12.1f} {speedup:>7.2f}x {efficiency:>8.2f}")
+
+
+def benchmark(args, app, path, make_payload, app_env=None):
+    """
+    启动（或连接）被测服务并逐级压测
+
+    Returns:
+        dict: url、fixtures、levels、mock_stats
+    """
+    processes = []
+    workdir = tempfile.TemporaryDirectory() if args.spawn else None
+    try:
+        if args.spawn:
+            processes, base_url, mock_url = spawn_services(app, mock_arguments(args), workdir.name,
+                                                           app_env=app_env)
+        else:
+            base_url, mock_url = args.base_url, args.mock_url
+
+        fixtures = requests.get(f"{mock_url}/_fixtures", timeout=10).json()
+        links = [note['short_url'] for note in fixtures['notes']]
+        payloads = [make_payload(link, args) for link in links]
+        url = base_url.rstrip('/') + path
+
+        if args.warmup:
+            run_level(url, payloads, 1, args.warmup)
+
+        print(f"压测 {url}（{len(links)} 条笔记）")
+        print(f"{'并发':>6} {'请求数':>6} {'吞吐量/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  错误")
+        levels = []
+        for concurrency in [int(value) for value in args.concurrency.split(',') if value]:
+            level = run_level(url, payloads, concurrency, args.requests)
+            print_level(level)
+            levels.append(level)
+        mock_stats = requests.get(f"{mock_url}/_stats", timeout=10).json()
+    finally:
+        stop_services(processes)
+        if workdir:
+            workdir.cleanup()
+    return {'url': url, 'fixtures': fixtures, 'levels': levels, 'mock_stats': mock_stats}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="逐级加压测试API的吞吐量和延迟")
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='extract/', help="被测端点")
+    parser.add_argument('--base-url', help="已运行的被测服务地址")
+    parser.add_argument('--mock-url', default='http://127.0.0.1:9000', help="已运行的模拟服务器地址")
+    parser.add_argument('--spawn', action='store_true', help="自动启动模拟服务器和被测服务")
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32', help="逗号分隔的并发数")
+    parser.add_argument('--requests', type=int, default=200, help="每一级的请求数")
+    parser.add_argument('--warmup', type=int, default=10, help="正式压测前的预热请求数")
+    parser.add_argument('--allow-cache', action='store_true', help="/extract/ 允许直接返回结果库中的结果")
+    parser.add_argument('--output-dir', default='load_results', help="结果保存目录")
+    parser.add_argument('--compare', help="之前保存的结果文件")
+    parser.add_argument('--cluster', help="逗号分隔的工作进程数，依次以 XHS_SCRAPE_WORKERS 启动 app.py 比较扩展性")
+    mock_xhs_server.add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    app, path, make_payload = ENDPOINTS[args.endpoint]
+    if not args.spawn and not args.base_url:
+        parser.error("需要指定 --base-url 或 --spawn")
+    if args.cluster and (not args.spawn or app != 'app:app'):
+        parser.error("--cluster 需要 --spawn 且 --endpoint scrape/")
+
+    cluster_runs = None
+    if args.cluster:
+        cluster_runs = []
+        for workers in sorted(int(value) for value in args.cluster.split(',') if value):
+            print(f"\nXHS_SCRAPE_WORKERS={workers}")
+            run = benchmark(args, app, path, make_payload, app_env={'XHS_SCRAPE_WORKERS': str(workers)})
+            cluster_runs.append({'workers': workers, 'levels': run['levels']})
+        print_scaling(cluster_runs)
+    else:
+        run = benchmark(args, app, path, make_payload)
+    url, fixtures, levels, mock_stats = run['url'], run['fixtures'], run['levels'], run['mock_stats']
+
+    result = {
+        'endpoint': args.endpoint,
+        'url': url,
+        'started_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'git_commit': _git_commit(),
+        'mock_config': fixtures['config'],
+        'mock_stats': mock_stats,
+        'levels': levels,
+    }
+    if cluster_runs:
+        # levels 为工作进程数最多的一次，便于 --compare
+        result['cluster'] = cluster_runs
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir,
+                               f"{args.endpoint.strip('/')}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {output_path}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_results(result, json.load(f))
+    return result
+
+
+if __name__ == "__main__":
+    main()
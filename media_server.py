@@ -0,0 +1,160 @@
+"""
+本地图片/视频的直接分发
+
+- 支持单个Range请求（视频拖动、断点续传），If-Range
+- 强ETag（inode + 大小 + 修改时间）、Last-Modified、Cache-Control，重复请求返回304
+- ASGI服务器支持 http.response.zerocopysend 扩展时直接交给服务器用sendfile发送；
+  否则按固定大小分块读取发送，不会把整个文件读入内存
+"""
+import email.utils
+import mimetypes
+import os
+from urllib.parse import quote
+
+import anyio
+from fastapi import HTTPException
+from starlette.responses import Response
+
+
+MEDIA_ROOT = 'xiaohongshu_posts'
+MEDIA_URL_PREFIX = '/media/'
+CACHE_CONTROL = 'public, max-age=86400'
+CHUNK_SIZE = 256 * 1024
+
+
+def resolve_media_path(relative_path, root=None):
+    """
+    把请求路径解析为媒体目录下的文件，拒绝目录穿越
+
+    Raises:
+        HTTPException: 文件不存在或不在媒体目录下时返回404
+    """
+    root = os.path.realpath(root or MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(root, relative_path))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="文件不存在")
+    return path
+
+
+def media_url(filepath, root=None):
+    """把本地文件路径转换为 /media/ 下的URL"""
+    relative = os.path.relpath(os.path.realpath(filepath), os.path.realpath(root or MEDIA_ROOT))
+    return MEDIA_URL_PREFIX + quote(relative.replace(os.sep, '/'))
+
+
+def make_etag(stat):
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    解析单个Range请求头
+
+    Returns:
+        tuple: (start, end)，没有Range头或格式不支持时返回None
+
+    Raises:
+        ValueError: 范围无法满足
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start_text, sep, end_text = header[len('bytes='):].strip().partition('-')
+    if not sep or not (start_text or end_text):
+        return None
+    if (start_text and not start_text.isdigit()) or (end_text and not end_text.isdigit()):
+        return None
+    if not start_text:
+        # bytes=-N 表示最后N个字节
+        length = int(end_text)
+        if length == 0 or size == 0:
+            raise ValueError("无效的范围")
+        return max(0, size - length), size - 1
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size or end < start:
+        raise ValueError("无效的范围")
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(Response):
+    """发送文件的一个区间"""
+
+    def __init__(self, path, start, end, status_code, headers, send_body=True):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.send_body = send_body
+
+    async def __call__(self, scope, receive, send):
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+        count = self.end - self.start + 1
+        if not self.send_body or count <= 0:
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            return
+
+        if 'http.response.zerocopysend' in scope.get('extensions', {}):
+            with open(self.path, 'rb') as f:
+                await send({'type': 'http.response.zerocopysend', 'file': f.fileno(),
+                            'offset': self.start, 'count': count, 'more_body': False})
+            return
+
+        async with await anyio.open_file(self.path, 'rb') as f:
+            await f.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': remaining > 0})
+            if remaining > 0:
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+
+def media_response(request, path):
+    """
+    根据请求头构造文件响应（200 / 206 / 304 / 416）
+
+    Args:
+        request (Request): 当前请求
+        path (str): 已解析的文件路径
+
+    Returns:
+        Response: 响应对象
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = make_etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': email.utils.formatdate(stat.st_mtime, usegmt=True),
+        'Cache-Control': CACHE_CONTROL,
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]):
+        return Response(status_code=304, headers=headers)
+
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    headers['Content-Type'] = content_type
+    send_body = request.method != 'HEAD'
+
+    range_header = request.headers.get('range')
+    if_range = request.headers.get('if-range')
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers['Content-Range'] = f'bytes */{size}'
+            headers['Content-Length'] = '0'
+            return Response(status_code=416, headers=headers)
+        if byte_range:
+            start, end = byte_range
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            headers['Content-Length'] = str(end - start + 1)
+            return RangeFileResponse(path, start, end, 206, headers, send_body)
+
+    headers['Content-Length'] = str(size)
+    return RangeFileResponse(path, 0, size - 1, 200, headers, send_body)
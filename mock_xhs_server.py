@@ -0,0 +1,350 @@
+"""
+本地小红书模拟服务器（用于压测，不访问真实网站）
+
+模拟以下域名，请求路径为 /_host/<域名>/<原路径>（由 http_client.upstream_url 改写）：
+- xhslink.com：短链接302重定向到笔记页
+- www.xiaohongshu.com：首页和笔记页（/explore/<note_id>、/discovery/item/<note_id>），内容来自fixtures
+- *.xhscdn.com、ci.xiaohongshu.com：图片（PNG）和视频（支持Range请求）
+
+可以配置延迟、抖动、错误率和限流（令牌桶，超出时返回429）。
+控制接口：GET /_fixtures 返回所有笔记和短链接，GET /_stats 返回请求统计。
+
+用法:
+    python mock_xhs_server.py --port 9000 --notes 200 --latency-ms 80 --jitter-ms 40 --error-rate 0.01 --rate-limit 100
+    XHS_MOCK_UPSTREAM=http://127.0.0.1:9000 uvicorn xhs_metadata_api:app --port 8080
+"""
+import argparse
+import functools
+import hashlib
+import html
+import json
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_client import MOCK_PATH_PREFIX
+
+
+NOTE_PATH_RE = re.compile(r'^/(?:explore|discovery/item)/([0-9A-Za-z]+)$')
+SHORT_PATH_RE = re.compile(r'^/(?:a/)?([0-9A-Za-z]+)$')
+RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)')
+XHS_URL_RE = re.compile(r'https?://((?:[\w-]+\.)*(?:xiaohongshu\.com|xhslink\.com|xhscdn\.com))')
+
+
+def generate_notes(count=100, seed=0, video_ratio=0.1, images_per_note=4):
+    """
+    生成确定性的笔记fixtures
+
+    Returns:
+        list: 笔记字典列表，包含 note_id、short_code、title、description、author、images、video
+    """
+    rng = random.Random(seed)
+    notes = []
+    for i in range(count):
+        notes.append({
+            'note_id': f"{rng.getrandbits(96):024x}",
+            'short_code': ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789')
+                                  for _ in range(13)),
+            'title': f"模拟笔记 {i}",
+            'description': f"这是第 {i} 条模拟笔记的正文，用于压测。",
+            'author': f"模拟作者{i % 17}",
+            'images': [f"1040g2sg{rng.getrandbits(128):032x}" for _ in range(images_per_note)],
+            'video': rng.random() < video_ratio,
+        })
+    return notes
+
+
+def load_fixtures(path):
+    """从JSON文件加载笔记fixtures（格式同 generate_notes，可以额外提供 html 字段直接返回）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@functools.lru_cache(maxsize=1024)
+def _png_bytes(seed, padding=0):
+    """生成16x16的PNG图片，padding为附加的私有数据块大小，用来模拟真实图片的体积"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    color = hashlib.md5(seed.encode('utf-8')).digest()[:3]
+    raw = b''.join(b'\x00' + color * 16 for _ in range(16))
+    png = b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', 16, 16, 8, 2, 0, 0, 0))
+    if padding:
+        png += chunk(b'mcKp', random.Random(seed).randbytes(padding))
+    return png + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b'')
+
+
+def render_note(note):
+    """渲染笔记页，同时满足 xhs_metadata_api、transform_xhs 和 Selenium 抓取器的选择器"""
+    if note.get('html'):
+        return note['html']
+    escape = html.escape
+    # 与真实页面一样，每次打开页面时图片URL的时间戳和签名都会变化
+    image_urls = [f"http://sns-webpic-qc.xhscdn.com/{time.strftime('%Y%m%d%H%M')}/{random.getrandbits(128):032x}/"
+                  f"{token}!nd_dft_wlteh_webp_3" for token in note['images']]
+    head = [
+        f'<meta name="og:title" property="og:title" content="{escape(note["title"])}">',
+        f'<meta name="description" content="{escape(note["description"])}">',
+    ]
+    head += [f'<meta name="og:image" property="og:image" content="{url}">' for url in image_urls]
+    body = [
+        f'<div class="author-wrapper"><span class="username">{escape(note["author"])}</span></div>',
+        f'<h1 class="title">{escape(note["title"])}</h1>',
+        f'<div class="desc">{escape(note["description"])}</div>',
+    ]
+    body += [f'<img src="{url}">' for url in image_urls]
+    if note.get('video'):
+        video_url = f"http://sns-video-bd.xhscdn.com/stream/{note['note_id']}.mp4"
+        head.append(f'<meta name="og:video" property="og:video" content="{video_url}">')
+        body.append(f'<div class="player-el"><video src="{video_url}"></video></div>')
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>{escape(note["title"])} - 小红书</title>{"".join(head)}</head>'
+            f'<body>{"".join(body)}</body></html>')
+
+
+class TokenBucket:
+    """令牌桶限流，rate为每秒补充的令牌数"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MockConfig:
+    """
+    Args:
+        latency_ms (float): 每个请求的基础延迟
+        jitter_ms (float): 在基础延迟上附加的均匀随机延迟
+        error_rate (float): 返回500的比例
+        rate_limit (float): 每秒允许的请求数，超出返回429，0表示不限流
+        burst (int): 令牌桶容量
+        image_kb (int): 图片大小
+        video_kb (int): 视频大小
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limit=0, burst=None,
+                 image_kb=64, video_kb=4096):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.image_kb = image_kb
+        self.video_kb = video_kb
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class MockXHSServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, notes, config):
+        super().__init__(address, MockXHSHandler)
+        self.notes = {note['note_id']: note for note in notes}
+        self.short_codes = {note['short_code']: note['note_id'] for note in notes}
+        self.config = config
+        self.bucket = TokenBucket(config.rate_limit, config.burst) if config.rate_limit else None
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+        self.video = random.Random(0).randbytes(config.video_kb * 1024)
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+
+class MockXHSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body):
+        server = self.server
+        path, _, query = self.path.partition('?')
+        if path == '/_fixtures':
+            base = self.base_url()
+            notes = [dict(note, short_url=f"http://xhslink.com/a/{note['short_code']}",
+                          url=f"https://www.xiaohongshu.com/explore/{note['note_id']}")
+                     for note in server.notes.values()]
+            return self.send_json({'base_url': base, 'config': server.config.to_dict(), 'notes': notes})
+        if path == '/_stats':
+            with server.stats_lock:
+                return self.send_json(dict(server.stats))
+        if not path.startswith(MOCK_PATH_PREFIX):
+            return self.send_text(404, 'not found')
+
+        host, _, rest = path[len(MOCK_PATH_PREFIX):].partition('/')
+        rest = '/' + rest
+
+        # 故障注入：限流、延迟、随机错误
+        config = server.config
+        if server.bucket and not server.bucket.take():
+            server.count('429')
+            return self.send_text(429, 'too many requests', {'Retry-After': '1'})
+        if config.latency_ms or config.jitter_ms:
+            time.sleep((config.latency_ms + random.uniform(0, config.jitter_ms)) / 1000)
+        if config.error_rate and random.random() < config.error_rate:
+            server.count('500')
+            return self.send_text(500, 'injected error')
+
+        if host.endswith('xhslink.com'):
+            self.serve_short_link(rest)
+        elif host.endswith('xhscdn.com') or host.startswith('ci.'):
+            self.serve_media(host, rest, send_body)
+        elif host.endswith('xiaohongshu.com'):
+            self.serve_page(rest, send_body)
+        else:
+            self.send_text(404, 'unknown host')
+
+    def base_url(self):
+        return f"http://{self.headers.get('Host') or '%s:%d' % self.server.server_address[:2]}"
+
+    def public_url(self, url):
+        """requests客户端（经过MockUpstreamAdapter）看到真实URL，浏览器看到模拟服务器地址"""
+        if self.headers.get('X-Mock-Client') == 'requests':
+            return url
+        return XHS_URL_RE.sub(lambda m: f"{self.base_url()}{MOCK_PATH_PREFIX}{m.group(1)}", url)
+
+    def serve_short_link(self, path):
+        match = SHORT_PATH_RE.match(path)
+        note_id = self.server.short_codes.get(match.group(1)) if match else None
+        if not note_id:
+            self.server.count('short_link_404')
+            return self.send_text(404, 'short link not found')
+        self.server.count('short_link')
+        location = self.public_url(f"https://www.xiaohongshu.com/discovery/item/{note_id}")
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def serve_page(self, path, send_body):
+        if path == '/':
+            # 首页不包含“登录”字样，抓取器会认为已经登录
+            self.server.count('home')
+            return self.send_body(200, 'text/html; charset=utf-8',
+                                  '<!DOCTYPE html><html><head><title>小红书</title></head><body>发现</body></html>'.encode('utf-8'),
+                                  send_body, {'Set-Cookie': 'web_session=mock; Path=/; Max-Age=86400'})
+        match = NOTE_PATH_RE.match(path)
+        note = self.server.notes.get(match.group(1)) if match else None
+        if not note:
+            self.server.count('page_404')
+            return self.send_text(404, 'note not found')
+        self.server.count('page')
+        body = self.public_url(render_note(note)).encode('utf-8')
+        self.send_body(200, 'text/html; charset=utf-8', body, send_body)
+
+    def serve_media(self, host, path, send_body):
+        if path.endswith('.mp4'):
+            self.server.count('video')
+            return self.send_range(self.server.video, 'video/mp4', send_body)
+        self.server.count('image')
+        padding = self.server.config.image_kb * 1024
+        self.send_body(200, 'image/png', _png_bytes(path, padding), send_body, {'Cache-Control': 'max-age=86400'})
+
+    def send_range(self, data, content_type, send_body):
+        size = len(data)
+        match = RANGE_RE.fullmatch(self.headers.get('Range', ''))
+        if not match:
+            return self.send_body(200, content_type, data, send_body, {'Accept-Ranges': 'bytes'})
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        if start >= size or end < start:
+            return self.send_body(416, content_type, b'', send_body, {'Content-Range': f'bytes */{size}'})
+        self.send_body(206, content_type, data[start:end + 1], send_body,
+                       {'Accept-Ranges': 'bytes', 'Content-Range': f'bytes {start}-{end}/{size}'})
+
+    def send_json(self, payload):
+        self.send_body(200, 'application/json', json.dumps(payload, ensure_ascii=False).encode('utf-8'), True)
+
+    def send_text(self, status, text, headers=None):
+        self.send_body(status, 'text/plain; charset=utf-8', text.encode('utf-8'), True, headers)
+
+    def send_body(self, status, content_type, body, send_body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_server(notes=None, config=None, host='127.0.0.1', port=0):
+    """在后台线程中启动模拟服务器，返回 (server, base_url)"""
+    server = MockXHSServer((host, port), notes if notes is not None else generate_notes(), config or MockConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def add_config_arguments(parser):
+    """模拟服务器的命令行参数，load_test.py 启动模拟服务器时复用"""
+    parser.add_argument('--notes', type=int, default=100, help="生成的笔记数量")
+    parser.add_argument('--fixtures', help="笔记fixtures的JSON文件，设置后忽略 --notes")
+    parser.add_argument('--seed', type=int, default=0, help="生成笔记的随机种子")
+    parser.add_argument('--latency-ms', type=float, default=50, help="每个请求的基础延迟（毫秒）")
+    parser.add_argument('--jitter-ms', type=float, default=20, help="附加的随机延迟上限（毫秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="返回500的比例")
+    parser.add_argument('--rate-limit', type=float, default=0, help="每秒允许的请求数，超出返回429，0表示不限流")
+    parser.add_argument('--burst', type=int, help="令牌桶容量，默认等于 --rate-limit")
+    parser.add_argument('--image-kb', type=int, default=64, help="图片大小（KB）")
+    parser.add_argument('--video-kb', type=int, default=4096, help="视频大小（KB）")
+
+
+def config_from_args(args):
+    return MockConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit, args.burst,
+                      args.image_kb, args.video_kb)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地小红书模拟服务器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    notes = load_fixtures(args.fixtures) if args.fixtures else generate_notes(args.notes, args.seed)
+    server = MockXHSServer((args.host, args.port), notes, config_from_args(args))
+    print(f"模拟服务器运行在 http://{args.host}:{server.server_port}，共 {len(notes)} 条笔记")
+    print(f"启动被测服务时设置: XHS_MOCK_UPSTREAM=http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
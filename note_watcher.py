@@ -0,0 +1,315 @@
+"""
+笔记和作者的增量监控
+
+原来需要定时把所有URL重新提交给 /extract/ 或 /scrape/。这里在SQLite中记录每个被监控的
+笔记/作者上一次的内容指纹，到期时只运行廉价的HTTP提取（xhs_metadata_api.extract_metadata）
+计算指纹，只有指纹变化的笔记才运行完整抓取（浏览器 + 下载图片），
+所以轮询成本取决于内容变化的频率，而不是监控列表的长度。
+
+- 笔记指纹：标题、描述和图片token（xhs_images.image_key，不受URL签名变化影响）
+- 作者指纹：主页中出现的笔记ID集合，开始监控之后新出现的笔记会自动加入监控
+- 每一项单独调整检查间隔：有变化时减半，没有变化时增加50%，失败时指数退避
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from xhs_links import find_first_link, note_id_from_url
+from xhs_images import image_key
+
+
+DEFAULT_WATCH_DB = os.environ.get('XHS_WATCH_DB', 'xiaohongshu_watch.db')
+
+PROFILE_RE = re.compile(r'https?://(?:www\.)?xiaohongshu\.com/user/profile/([0-9A-Za-z]+)/?(?:[?#].*)?$')
+# 主页中的笔记链接通常是相对路径
+PROFILE_NOTE_RE = re.compile(r'/(?:explore|discovery/item|user/profile/[0-9A-Za-z]+)/([0-9a-f]{24})\b')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watches (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    fingerprint TEXT,
+    state TEXT,
+    interval REAL NOT NULL,
+    next_check REAL NOT NULL,
+    last_checked REAL,
+    last_changed REAL,
+    checks INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_watches_next_check ON watches (next_check);
+"""
+
+_COLUMNS = ("kind", "key", "url", "fingerprint", "state", "interval", "next_check", "last_checked",
+            "last_changed", "checks", "changes", "failures", "last_error")
+
+
+def note_fingerprint(metadata):
+    """根据标题、描述和图片token计算笔记指纹"""
+    tokens = sorted({image_key(url) for url in metadata.get('image_urls', [])})
+    payload = json.dumps([metadata.get('title', ''), metadata.get('description', ''), tokens], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def author_fingerprint(note_ids):
+    return hashlib.sha1(','.join(sorted(note_ids)).encode('utf-8')).hexdigest()
+
+
+def author_id_from_url(url):
+    """从作者主页URL中解析用户ID，不是主页URL时返回None"""
+    match = PROFILE_RE.match(url.strip())
+    return match.group(1) if match else None
+
+
+def fetch_note_metadata(url):
+    """廉价的HTTP提取，只获取元数据不下载图片"""
+    from xhs_metadata_api import extract_metadata
+
+    return extract_metadata(url)
+
+
+def fetch_author_note_ids(url):
+    """获取作者主页中的笔记ID列表"""
+    from cookie_store import get_cookie_store
+    from fetch_guard import LoginRequiredError, is_login_redirect
+    from http_client import get_session
+
+    response = get_session().get(url, timeout=30)
+    response.raise_for_status()
+    if is_login_redirect(response.url):
+        get_cookie_store().mark_stale()
+        raise LoginRequiredError(f"需要登录才能查看: {response.url}")
+    return list(dict.fromkeys(PROFILE_NOTE_RE.findall(response.text)))
+
+
+def resolve_note_url(url):
+    """短链接跟踪重定向得到带笔记ID的长链接"""
+    if note_id_from_url(url) or 'xhslink.com' not in url:
+        return url
+    from http_client import get_session
+
+    return get_session().head(url, allow_redirects=True, timeout=10).url
+
+
+class NoteWatcher:
+    """
+    Args:
+        path (str): 数据库文件路径
+        full_scrape (Callable[[str], object]): 指纹变化时调用的完整抓取，抛出异常表示失败（下次重试）
+        fetch_note (Callable[[str], dict]): 廉价提取，返回包含 title/description/image_urls 的字典
+        fetch_author_notes (Callable[[str], list]): 返回作者主页中的笔记ID
+        initial_interval (float): 新加入监控的检查间隔（秒）
+        min_interval (float): 最短检查间隔
+        max_interval (float): 最长检查间隔
+        workers (int): 同时进行廉价提取的线程数
+    """
+
+    def __init__(self, path=DEFAULT_WATCH_DB, full_scrape=None, fetch_note=fetch_note_metadata,
+                 fetch_author_notes=fetch_author_note_ids, initial_interval=3600, min_interval=300,
+                 max_interval=86400, workers=4):
+        self.path = path
+        self.full_scrape = full_scrape
+        self.fetch_note = fetch_note
+        self.fetch_author_notes = fetch_author_notes
+        self.initial_interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.workers = workers
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _row_to_dict(self, row):
+        item = dict(zip(_COLUMNS, row))
+        item['state'] = json.loads(item['state']) if item['state'] else {}
+        return item
+
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def add(self, url, interval=None):
+        """
+        添加监控，自动识别作者主页和笔记链接（短链接会先跟踪重定向）
+
+        Returns:
+            dict: 监控项
+
+        Raises:
+            ValueError: 无法识别的链接
+        """
+        if author_id_from_url(url):
+            return self.add_author(url.strip(), interval)
+        link = find_first_link(url)
+        try:
+            note_url = resolve_note_url(link.url if link else url.strip())
+        except requests.RequestException as e:
+            raise ValueError(f"跟踪短链接失败: {e}")
+        note_id = note_id_from_url(note_url)
+        if not note_id:
+            raise ValueError(f"无法识别的小红书链接: {url}")
+        return self.add_note(note_url, note_id, interval)
+
+    def add_note(self, url, note_id, interval=None):
+        return self._add('note', note_id, url, interval)
+
+    def add_author(self, url, interval=None):
+        return self._add('author', author_id_from_url(url), url, interval)
+
+    def _add(self, kind, key, url, interval):
+        interval = self._clamp(interval or self.initial_interval)
+        # 已经在监控中时只更新URL和间隔，保留指纹
+        self._execute(
+            "INSERT INTO watches (kind, key, url, interval, next_check) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (kind, key) DO UPDATE SET url = excluded.url, interval = excluded.interval",
+            (kind, key, url, interval, time.time()))
+        return self.get(kind, key)
+
+    def get(self, kind, key):
+        rows = self._execute(f"SELECT {', '.join(_COLUMNS)} FROM watches WHERE kind = ? AND key = ?", (kind, key))
+        return self._row_to_dict(rows[0]) if rows else None
+
+    def remove(self, kind, key):
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM watches WHERE kind = ? AND key = ?", (kind, key)).rowcount > 0
+
+    def list_watches(self, kind=None):
+        if kind:
+            rows = self._execute(f"SELECT {', '.join(_COLUMNS)} FROM watches WHERE kind = ? ORDER BY next_check", (kind,))
+        else:
+            rows = self._execute(f"SELECT {', '.join(_COLUMNS)} FROM watches ORDER BY next_check")
+        return [self._row_to_dict(row) for row in rows]
+
+    def due(self, now=None, limit=100):
+        rows = self._execute(f"SELECT {', '.join(_COLUMNS)} FROM watches WHERE next_check <= ? "
+                             "ORDER BY next_check LIMIT ?", (now or time.time(), limit))
+        return [self._row_to_dict(row) for row in rows]
+
+    def _schedule(self, interval):
+        # 加一点随机抖动，避免同时加入的项目一直在同一时刻检查
+        return time.time() + interval * random.uniform(0.9, 1.1)
+
+    def _record_check(self, item, fingerprint, changed, state):
+        if item['fingerprint'] is None:
+            interval = item['interval']  # 第一次检查只是建立基线
+        else:
+            interval = self._clamp(item['interval'] / 2 if changed else item['interval'] * 1.5)
+        now = time.time()
+        self._execute(
+            "UPDATE watches SET fingerprint = ?, state = ?, interval = ?, next_check = ?, last_checked = ?, "
+            "last_changed = CASE WHEN ? THEN ? ELSE last_changed END, checks = checks + 1, "
+            "changes = changes + ?, failures = 0, last_error = NULL WHERE kind = ? AND key = ?",
+            (fingerprint, json.dumps(state, ensure_ascii=False), interval, self._schedule(interval), now,
+             changed, now, int(changed), item['kind'], item['key']))
+        return {'kind': item['kind'], 'key': item['key'], 'changed': changed}
+
+    def _record_failure(self, item, error):
+        detail = getattr(error, 'detail', None) or str(error)
+        failures = item['failures'] + 1
+        # 失败时指数退避，不改变正常的检查间隔
+        delay = min(self.max_interval, item['interval'] * 2 ** min(failures, 6))
+        self._execute(
+            "UPDATE watches SET next_check = ?, last_checked = ?, checks = checks + 1, failures = ?, "
+            "last_error = ? WHERE kind = ? AND key = ?",
+            (self._schedule(delay), time.time(), failures, detail, item['kind'], item['key']))
+        print(f"检查失败 {item['kind']}/{item['key']}: {detail}")
+        return {'kind': item['kind'], 'key': item['key'], 'changed': False, 'error': detail}
+
+    def check(self, item):
+        """
+        检查一个监控项
+
+        Returns:
+            dict: kind、key、changed，失败时包含error
+        """
+        if item['kind'] == 'author':
+            return self._check_author(item)
+        return self._check_note(item)
+
+    def _check_note(self, item):
+        try:
+            metadata = self.fetch_note(item['url'])
+        except Exception as e:
+            return self._record_failure(item, e)
+        fingerprint = note_fingerprint(metadata)
+        changed = fingerprint != item['fingerprint']
+        if changed and self.full_scrape:
+            try:
+                self.full_scrape(item['url'])
+            except Exception as e:
+                # 不更新指纹，下次检查时重新抓取
+                return self._record_failure(item, e)
+        state = {'title': metadata.get('title', ''), 'image_count': len(metadata.get('image_urls', []))}
+        return self._record_check(item, fingerprint, changed, state)
+
+    def _check_author(self, item):
+        try:
+            note_ids = self.fetch_author_notes(item['url'])
+        except Exception as e:
+            return self._record_failure(item, e)
+        known = set(item['state'].get('note_ids', []))
+        # 第一次检查只记录已有的笔记作为基线，之后新发布的笔记才加入监控
+        new_ids = [note_id for note_id in note_ids if note_id not in known] if item['fingerprint'] else []
+        for note_id in new_ids:
+            if self.get('note', note_id):
+                continue
+            # 首次检查时会完整抓取
+            self.add_note(f"https://www.xiaohongshu.com/explore/{note_id}", note_id)
+        fingerprint = author_fingerprint(note_ids)
+        result = self._record_check(item, fingerprint, fingerprint != item['fingerprint'],
+                                    {'note_ids': sorted(known | set(note_ids))})
+        result['new_notes'] = new_ids
+        return result
+
+    def run_due(self, now=None, limit=100):
+        """检查所有到期的监控项，返回每一项的检查结果"""
+        items = self.due(now, limit)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as executor:
+            return list(executor.map(self.check, items))
+
+    def seconds_until_next_check(self):
+        rows = self._execute("SELECT MIN(next_check) FROM watches")
+        if not rows or rows[0][0] is None:
+            return None
+        return max(0.0, rows[0][0] - time.time())
+
+    def _loop(self, poll_interval):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                print(f"运行监控检查时出错: {e}")
+            wait = self.seconds_until_next_check()
+            self._stop.wait(poll_interval if wait is None else min(max(wait, 0.5), poll_interval))
+
+    def start(self, poll_interval=30):
+        """在后台线程中定时检查，新加入的监控项最迟poll_interval秒后开始检查"""
+        self._thread = threading.Thread(target=self._loop, args=(poll_interval,), name="note-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=30):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._conn.close()
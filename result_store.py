@@ -0,0 +1,216 @@
+"""
+本地抓取结果存储
+
+使用SQLite（WAL模式）追加保存每一次抓取结果，按笔记ID、短链接、作者和抓取时间建立索引，
+写入由后台线程批量提交，查询可以直接返回历史结果而无需再次访问小红书。
+多个进程可以同时读写同一个数据库文件。
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from xhs_links import note_id_from_url
+
+
+DEFAULT_DB_PATH = os.environ.get('XHS_RESULTS_DB', 'xiaohongshu_results.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    note_id TEXT,
+    short_url TEXT,
+    url TEXT,
+    author TEXT,
+    title TEXT,
+    fetched_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_note_id ON results (note_id, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_results_short_url ON results (short_url, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_results_author ON results (author, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_results_fetched_at ON results (fetched_at);
+"""
+
+_COLUMNS = "id, note_id, short_url, url, author, title, fetched_at, data"
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _row_to_dict(row):
+    record = dict(zip(("id", "note_id", "short_url", "url", "author", "title", "fetched_at"), row[:7]))
+    record['data'] = json.loads(row[7])
+    return record
+
+
+class ResultStore:
+    """
+    追加写入的抓取结果库
+
+    Args:
+        path (str): 数据库文件路径
+        batch_size (int): 每个事务最多写入的行数
+        flush_interval (float): 后台线程最长等待多久提交一次（秒）
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=200, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        with _connect(path) as conn:
+            conn.executescript(_SCHEMA)
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="result-store-writer", daemon=True)
+        self._writer.start()
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = _connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def add(self, data, note_id=None, short_url=None, url=None, author=None, fetched_at=None):
+        """
+        记录一次抓取结果（异步批量写入）
+
+        未显式传入的索引字段会尽量从data中推断：
+        url取extracted_url/url/original_url，笔记ID从长链接中解析，短链接取其中的xhslink.com链接。
+
+        Args:
+            data (dict): 抓取结果，需要能被JSON序列化
+        """
+        if self._closed:
+            raise RuntimeError("ResultStore已关闭")
+        if short_url is None:
+            short_url = next((candidate for candidate in (data.get('original_url'), data.get('url'))
+                              if candidate and 'xhslink.com' in candidate), None)
+        url = url or data.get('extracted_url') or data.get('url') or data.get('original_url')
+        note_id = note_id or data.get('note_id') or (note_id_from_url(url) if url else None)
+        author = author or data.get('author')
+        row = (note_id, short_url, url, author, data.get('title'),
+               fetched_at or time.time(), json.dumps(data, ensure_ascii=False))
+        self._queue.put(row)
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        while True:
+            item = self._queue.get()
+            rows, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    # 有人在等待flush，立即提交
+                    deadline = 0
+                else:
+                    rows.append(item)
+                if len(rows) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO results (note_id, short_url, url, author, title, fetched_at, data) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                except sqlite3.Error as e:
+                    print(f"写入结果库时出错: {e}")
+            for waiter in waiters:
+                waiter.set()
+            if item is None:
+                conn.close()
+                return
+
+    def flush(self, timeout=None):
+        """等待已提交的结果全部写入数据库"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    def query(self, note_id=None, short_url=None, author=None, since=None, until=None, limit=50):
+        """
+        按条件查询历史结果，按抓取时间倒序返回
+
+        Args:
+            note_id (str): 笔记ID
+            short_url (str): 分享短链接
+            author (str): 作者
+            since (float): 抓取时间下限（Unix时间戳）
+            until (float): 抓取时间上限（Unix时间戳）
+            limit (int): 最多返回的条数
+
+        Returns:
+            list: 结果字典列表
+        """
+        conditions, params = [], []
+        for column, value in (('note_id', note_id), ('short_url', short_url), ('author', author)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("fetched_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("fetched_at <= ?")
+            params.append(until)
+        sql = f"SELECT {_COLUMNS} FROM results"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY fetched_at DESC LIMIT ?"
+        params.append(limit)
+        rows = self._reader().execute(sql, params).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def get_latest(self, note_id=None, short_url=None, max_age=None):
+        """
+        获取某条笔记最近一次的结果
+
+        Args:
+            note_id (str): 笔记ID
+            short_url (str): 分享短链接
+            max_age (float): 结果的最长有效期（秒），None表示不限
+
+        Returns:
+            dict: 结果字典，不存在时返回None
+        """
+        if note_id is None and short_url is None:
+            return None
+        since = time.time() - max_age if max_age is not None else None
+        results = self.query(note_id=note_id, short_url=short_url, since=since, limit=1)
+        return results[0] if results else None
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_store():
+    """进程内共享的默认结果库"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ResultStore()
+        return _default_store
@@ -0,0 +1,309 @@
+"""
+多进程抓取集群
+
+由一个监督者（运行在API进程中）管理N个工作进程，每个工作进程拥有自己的浏览器。
+任务按笔记ID分片：同一条笔记总是交给同一个工作进程处理，便于复用浏览器缓存。
+工作进程退出后会被自动重启，正在处理的任务以失败返回。
+
+进程间共享的状态都使用进程安全的存储：
+- cookies：cookie_store 原子替换文件，其他进程按修改时间重新加载
+- 抓取结果：result_store（SQLite WAL）
+- 图片：下载时先写临时文件再原子重命名
+
+启用方式（app.py）:
+    XHS_SCRAPE_WORKERS=4 uvicorn app:app
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+
+from xhs_links import note_id_from_url
+
+
+def default_scraper_factory(worker_count):
+    """工作进程中创建并预热浏览器"""
+    from xiaohongshu_scraper import XiaohongshuScraper
+    from image_pipeline import ImagePipeline
+
+    # 图片后处理进程池按工作进程数均分CPU
+    pipeline = ImagePipeline.from_env(default_workers=max(1, (os.cpu_count() or 1) // worker_count))
+    scraper = XiaohongshuScraper(image_pipeline=pipeline)
+    scraper.warm_up()
+    return scraper
+
+
+def _worker_main(index, worker_count, task_queue, result_queue, current_jobs, scraper_factory):
+    scraper = None
+    try:
+        scraper = scraper_factory(worker_count)
+        result_queue.put(('ready', index, None, None))
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            job_id, method, args = task
+            # 写共享内存而不是发消息：进程崩溃时消息可能还没发出去
+            current_jobs[index] = job_id
+            try:
+                result = getattr(scraper, method)(*args)
+                result_queue.put(('done', index, job_id, (result, None)))
+            except Exception as e:
+                result_queue.put(('done', index, job_id, (None, str(e))))
+            current_jobs[index] = -1
+    except Exception as e:
+        result_queue.put(('failed', index, None, str(e)))
+    finally:
+        if scraper is not None:
+            scraper.close()
+            image_pipeline = getattr(scraper, 'image_pipeline', None)
+            if image_pipeline:
+                image_pipeline.close()
+
+
+class WorkerCrashed(Exception):
+    """处理任务的工作进程意外退出或启动失败"""
+
+
+class WorkerUnavailable(WorkerCrashed):
+    """工作进程多次启动失败后不再重启，分到该进程的任务直接失败"""
+
+
+# 工作进程连续启动失败（从未就绪）达到该次数后不再重启
+MAX_START_FAILURES = 5
+# 重启的最长等待时间（秒），每次失败后加倍
+MAX_RESTART_DELAY = 60
+
+
+def _set_future(future, result=None, exception=None):
+    """设置Future的结果，已经完成或被取消（例如调用方超时）时忽略"""
+    if future.done():
+        return
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class ScrapeCluster:
+    """
+    Args:
+        workers (int): 工作进程数
+        scraper_factory (Callable[[int], object]): 在工作进程中创建scraper的函数（需要可以被pickle）
+        resolve_short_links (bool): 是否先跟踪短链接重定向，按真正的笔记ID分片
+        max_start_failures (int): 连续启动失败多少次后不再重启
+        max_restart_delay (float): 重启的最长等待时间（秒）
+    """
+
+    def __init__(self, workers, scraper_factory=default_scraper_factory, resolve_short_links=True,
+                 max_start_failures=MAX_START_FAILURES, max_restart_delay=MAX_RESTART_DELAY):
+        self.workers = workers
+        self.scraper_factory = scraper_factory
+        self.resolve_short_links = resolve_short_links
+        self.max_start_failures = max_start_failures
+        self.max_restart_delay = max_restart_delay
+        self._ctx = multiprocessing.get_context('spawn')
+        self._result_queue = self._ctx.Queue()
+        self._task_queues = [self._ctx.Queue() for _ in range(workers)]
+        self._processes = [None] * workers
+        self._ready = [False] * workers
+        self._current_jobs = self._ctx.Array('q', [-1] * workers, lock=False)  # 每个工作进程正在处理的任务
+        self._start_failures = [0] * workers  # 连续启动失败次数
+        self._restart_at = [None] * workers  # 计划重启的时间
+        self._given_up = [False] * workers
+        self._futures = {}  # job_id -> (工作进程序号, Future)
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._resolved = OrderedDict()  # 短链接 -> 长链接
+        # 跟踪短链接需要联网，放在线程池中进行，提交任务不会阻塞调用方（例如事件循环）
+        self._resolver = ThreadPoolExecutor(max_workers=8, thread_name_prefix='cluster-resolve')
+        self._threads = []
+
+    def start(self):
+        for index in range(self.workers):
+            self._start_worker(index)
+        for target, name in ((self._collect_results, 'cluster-results'), (self._supervise, 'cluster-supervisor')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _start_worker(self, index):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.workers, self._task_queues[index], self._result_queue, self._current_jobs,
+                  self.scraper_factory),
+            name=f"scrape-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+        self._ready[index] = False
+
+    def _fail_worker_jobs(self, index, exception):
+        """让分到某个工作进程的所有任务失败，并清空它的任务队列"""
+        while True:
+            try:
+                self._task_queues[index].get_nowait()
+            except (queue.Empty, EOFError, OSError):
+                break
+        with self._lock:
+            job_ids = [job_id for job_id, (routed, _) in self._futures.items() if routed == index]
+            futures = [self._futures.pop(job_id)[1] for job_id in job_ids]
+            # 进程在处理任务时退出，不会再清除自己的任务槽
+            self._current_jobs[index] = -1
+        for future in futures:
+            _set_future(future, exception=exception)
+
+    def _collect_results(self):
+        while not self._closing.is_set():
+            try:
+                kind, index, job_id, payload = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if kind == 'failed':
+                print(f"工作进程 {index} 启动失败: {payload}")
+                self._fail_worker_jobs(index, WorkerCrashed(f"工作进程 {index} 启动失败: {payload}"))
+                continue
+            with self._lock:
+                if kind == 'ready':
+                    self._ready[index] = True
+                    self._start_failures[index] = 0
+                    continue
+                _, future = self._futures.pop(job_id, (None, None))
+            if kind == 'done' and future is not None:
+                result, error = payload
+                _set_future(future, result, RuntimeError(error) if error else None)
+
+    def _supervise(self):
+        while not self._closing.wait(1.0):
+            for index, process in enumerate(self._processes):
+                if self._given_up[index] or process.is_alive():
+                    continue
+                if self._closing.is_set():
+                    return
+                if self._restart_at[index] is None:
+                    self._handle_exit(index, process)
+                elif time.monotonic() >= self._restart_at[index]:
+                    self._restart_at[index] = None
+                    self._start_worker(index)
+
+    def _handle_exit(self, index, process):
+        """工作进程退出后让它的任务失败，并按连续失败次数退避重启"""
+        self._fail_worker_jobs(index, WorkerCrashed(f"工作进程 {index} 已退出（exitcode={process.exitcode}）"))
+        if self._ready[index]:
+            # 就绪后在处理任务时崩溃，立即重启
+            delay = 0
+        else:
+            self._start_failures[index] += 1
+            if self._start_failures[index] >= self.max_start_failures:
+                self._given_up[index] = True
+                print(f"工作进程 {index} 连续 {self.max_start_failures} 次启动失败，不再重启")
+                return
+            delay = min(self.max_restart_delay, 2 ** (self._start_failures[index] - 1))
+        self._ready[index] = False
+        self._restart_at[index] = time.monotonic() + delay
+        print(f"工作进程 {index} 已退出（exitcode={process.exitcode}），{delay} 秒后重启")
+
+    def shard_key(self, url):
+        """分片键：笔记ID；短链接先跟踪重定向（会联网），失败时使用URL本身"""
+        note_id = note_id_from_url(url)
+        if note_id:
+            return note_id, url
+        if self.resolve_short_links and 'xhslink.com' in url:
+            final_url = self._resolve(url)
+            note_id = note_id_from_url(final_url) if final_url else None
+            if note_id:
+                return note_id, final_url
+        return url, url
+
+    def _resolve(self, short_url):
+        with self._lock:
+            if short_url in self._resolved:
+                return self._resolved[short_url]
+        try:
+            from http_client import get_session
+            final_url = get_session().head(short_url, allow_redirects=True, timeout=10).url
+        except Exception as e:
+            print(f"跟踪短链接失败: {short_url}, 错误: {str(e)}")
+            return None
+        with self._lock:
+            self._resolved[short_url] = final_url
+            while len(self._resolved) > 10000:
+                self._resolved.popitem(last=False)
+        return final_url
+
+    def shard_for(self, key):
+        """稳定的分片函数（不使用受随机化影响的hash()）"""
+        return zlib.crc32(key.encode('utf-8')) % self.workers
+
+    def _submit(self, index, method, *args, future=None):
+        future = future or Future()
+        if self._given_up[index]:
+            _set_future(future, exception=WorkerUnavailable(f"工作进程 {index} 无法启动"))
+            return future
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._futures[job_id] = (index, future)
+        self._task_queues[index].put((job_id, method, args))
+        return future
+
+    def _route_scrape(self, future, url, image_variant):
+        try:
+            key, target_url = self.shard_key(url)
+            self._submit(self.shard_for(key), 'scrape_post', target_url, image_variant, future=future)
+        except Exception as e:
+            _set_future(future, exception=e)
+
+    def submit_scrape(self, url, image_variant=None):
+        """
+        提交抓取任务，不会阻塞（短链接在线程池中跟踪重定向后再分片）
+
+        Returns:
+            Future: 结果为 scrape_post 的返回值
+        """
+        future = Future()
+        if self.resolve_short_links and not note_id_from_url(url) and 'xhslink.com' in url:
+            self._resolver.submit(self._route_scrape, future, url, image_variant)
+        else:
+            self._route_scrape(future, url, image_variant)
+        return future
+
+    def submit_login(self):
+        """在第一个工作进程中登录，cookies会通过 cookie_store 共享给其他进程"""
+        return self._submit(0, 'login')
+
+    def status(self):
+        with self._lock:
+            alive = [process is not None and process.is_alive() for process in self._processes]
+            ready = sum(1 for index in range(self.workers) if alive[index] and self._ready[index])
+            busy = sum(1 for job_id in self._current_jobs if job_id >= 0)
+            pending = len(self._futures)
+        return {'workers': self.workers, 'alive': sum(alive), 'ready': ready, 'busy': busy, 'pending': pending,
+                'given_up': sum(self._given_up)}
+
+    def close(self, timeout=30):
+        self._closing.set()
+        self._resolver.shutdown(wait=False, cancel_futures=True)
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+        with self._lock:
+            futures, self._futures = [future for _, future in self._futures.values()], {}
+        for future in futures:
+            _set_future(future, exception=RuntimeError("抓取集群已关闭"))
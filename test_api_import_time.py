@@ -0,0 +1,25 @@
+from bench_import_time import measure_imports
+
+
+# 只有 /extract 才需要的依赖
+HEAVY_MODULES = ('transform_xhs', 'bs4', 'requests', 'uvicorn')
+
+
+def test_api_cold_start_is_slim():
+    """Vercel入口导入时，以及处理 / 和 /health 时都不加载解析依赖"""
+    timings = measure_imports('api', "api.root()\napi.health_check()")
+    assert 'api' in timings
+    loaded = [name for name in HEAVY_MODULES if name in timings]
+    assert loaded == [], f"冷启动加载了解析依赖: {loaded}"
+
+
+def test_extract_loads_parser_lazily():
+    timings = measure_imports('api', "api.get_extractor()")
+    assert 'transform_xhs' in timings
+    assert 'bs4' not in timings  # BeautifulSoup在真正解析页面时才加载
+
+
+if __name__ == "__main__":
+    test_api_cold_start_is_slim()
+    test_extract_loads_parser_lazily()
+    print("测试通过")
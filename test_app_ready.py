@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+
+
+class FakeScraper:
+    """warm_up 在 release 被设置前一直阻塞，模拟浏览器启动"""
+    release = threading.Event()
+    error = None
+
+    def __init__(self, image_pipeline=None):
+        self.image_pipeline = image_pipeline
+
+    def warm_up(self):
+        FakeScraper.release.wait(10)
+        if FakeScraper.error:
+            raise RuntimeError(FakeScraper.error)
+
+    def scrape_post(self, url, image_variant=None):
+        # 在线程池中执行时没有正在运行的事件循环
+        try:
+            asyncio.get_running_loop()
+            on_event_loop = True
+        except RuntimeError:
+            on_event_loop = False
+        return {'title': url, 'content': str(on_event_loop), 'image_urls': [], 'downloaded_files': [],
+                'output_dir': 'xiaohongshu_posts'}
+
+    def login(self):
+        # 登录与抓取共用浏览器，需要持有锁
+        return app_module.scrape_lock.locked()
+
+    def close(self):
+        pass
+
+
+def start_warm_up(monkeypatch, error=None):
+    monkeypatch.setattr(app_module, 'XiaohongshuScraper', FakeScraper)
+    monkeypatch.setattr(app_module, 'scraper', None)
+    monkeypatch.setattr(app_module, 'warmup_state', {'status': 'starting', 'error': None})
+    FakeScraper.release = threading.Event()
+    FakeScraper.error = error
+    thread = threading.Thread(target=app_module.warm_up_scraper, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_ready_after_warm_up(monkeypatch):
+    thread = start_warm_up(monkeypatch)
+    client = TestClient(app_module.app)
+
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.json()['status'] == 'starting'
+    assert client.post('/scrape/', json={'url': 'https://www.xiaohongshu.com/explore/abc'}).status_code == 503
+
+    FakeScraper.release.set()
+    thread.join(5)
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.json() == {'ready': True, 'status': 'ready', 'warm_browsers': 1}
+
+    # 抓取在线程池中执行，不阻塞事件循环
+    monkeypatch.setattr(app_module, 'save_to_file', lambda data: None)
+    response = client.post('/scrape/', json={'url': 'https://www.xiaohongshu.com/explore/abc'})
+    assert response.status_code == 200
+    assert response.json()['content'] == 'False'
+    assert client.post('/login/').status_code == 200
+
+
+def test_failed_warm_up_is_reported(monkeypatch):
+    thread = start_warm_up(monkeypatch, error="chromedriver不存在")
+    FakeScraper.release.set()
+    thread.join(5)
+
+    response = TestClient(app_module.app).get('/ready')
+    assert response.status_code == 503
+    assert response.json()['status'] == 'failed'
+    assert response.json()['error'] == "chromedriver不存在"
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__, '-q'])
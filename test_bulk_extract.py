@@ -0,0 +1,43 @@
+import json
+import os
+import tempfile
+
+from bulk_extract import run
+
+
+def fake_extract(text):
+    if text.endswith('bad'):
+        raise ValueError("无效链接")
+    return {'title': text.upper()}
+
+
+def test_bulk_extract_resume():
+    """中断后重新运行，每一行恰好处理一次"""
+    lines = [f"http://xhslink.com/a/{i}" for i in range(200)]
+    lines[7] = ""
+    lines[50] = "http://xhslink.com/a/bad"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'results.jsonl')
+        checkpoint = os.path.join(tmp, 'results.jsonl.checkpoint')
+
+        first = run(lines, output, checkpoint, fake_extract, workers=4, limit=60, checkpoint_every=10)
+        assert first['processed'] == 60
+        second = run(lines, output, checkpoint, fake_extract, workers=4, checkpoint_every=10)
+        assert second['processed'] == 199 - 60
+
+        with open(output, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        indexes = [record['line'] for record in records]
+        assert sorted(indexes) == [i for i in range(200) if i != 7]
+        failed = [record for record in records if not record['ok']]
+        assert [record['line'] for record in failed] == [50]
+
+        # 全部完成后再次运行不会重复处理
+        third = run(lines, output, checkpoint, fake_extract, workers=4)
+        assert third['processed'] == 0
+
+
+if __name__ == "__main__":
+    test_bulk_extract_resume()
+    print("测试通过")
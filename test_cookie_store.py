@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+from cookie_store import CookieStore
+
+
+def test_cookie_store_expiry_and_session():
+    """cookies只读取一次文件，过期或失效后不再下发给HTTP客户端"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cookies.json')
+        now = time.time()
+        cookies = [
+            {'name': 'web_session', 'value': 'abc', 'domain': '.xiaohongshu.com', 'path': '/', 'expiry': int(now + 3600)},
+            {'name': 'a1', 'value': 'xyz', 'domain': '.xiaohongshu.com', 'path': '/'},
+        ]
+        with open(path, 'w') as f:
+            json.dump(cookies, f)
+
+        store = CookieStore(path)
+        assert store.is_valid()
+        version = store.version
+        assert store.is_valid() and store.version == version  # 文件未变化时不重新读取
+        assert store.expires_at() == int(now + 3600)
+        assert not store.is_valid(now=now + 3600)
+
+        session = requests.Session()
+        assert store.apply_to_session(session)
+        assert session.cookies.get('web_session', domain='.xiaohongshu.com') == 'abc'
+
+        store.mark_stale()
+        assert not store.is_valid()
+        assert not store.apply_to_session(session)
+        assert len(session.cookies) == 0
+
+        # 浏览器重新登录后写回
+        store.save(cookies[:1])
+        assert store.is_valid()
+        with open(path) as f:
+            assert json.load(f) == cookies[:1]
+
+
+if __name__ == "__main__":
+    test_cookie_store_expiry_and_session()
+    print("测试通过")
@@ -0,0 +1,68 @@
+import json
+import os
+import stat
+import tempfile
+
+import driver_resolver
+
+
+def make_executable(path):
+    with open(path, 'w') as f:
+        f.write("#!/bin/sh\n")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+
+
+def test_resolve_chromedriver_offline(monkeypatch):
+    """优先使用环境变量和缓存文件，不联网"""
+    with tempfile.TemporaryDirectory() as tmp:
+        driver = os.path.join(tmp, 'chromedriver')
+        make_executable(driver)
+        cache_file = os.path.join(tmp, 'cache.json')
+        monkeypatch.setattr(driver_resolver, 'DRIVER_CACHE_FILE', cache_file)
+
+        monkeypatch.setenv('CHROMEDRIVER_PATH', driver)
+        driver_resolver.resolve_chromedriver.cache_clear()
+        assert driver_resolver.resolve_chromedriver() == driver
+
+        # 固定版本时使用缓存中同版本的驱动
+        monkeypatch.delenv('CHROMEDRIVER_PATH')
+        monkeypatch.setenv('CHROMEDRIVER_VERSION', '126.0.6478.126')
+        with open(cache_file, 'w') as f:
+            json.dump({'version': '126.0.6478.126', 'path': driver}, f)
+        driver_resolver.resolve_chromedriver.cache_clear()
+        assert driver_resolver.resolve_chromedriver() == driver
+
+        # 同一进程内只解析一次
+        os.remove(cache_file)
+        assert driver_resolver.resolve_chromedriver() == driver
+
+        # 版本不一致的缓存会被忽略
+        assert driver_resolver._read_cache(cache_file, '127.0') is None
+        with open(cache_file, 'w') as f:
+            json.dump({'version': '126.0.6478.126', 'path': driver}, f)
+        assert driver_resolver._read_cache(cache_file, '127.0') is None
+    driver_resolver.resolve_chromedriver.cache_clear()
+
+
+def test_unpinned_cache_follows_chrome_version(monkeypatch):
+    """未固定版本时缓存按Chrome主版本号区分，Chrome更新后不再使用旧驱动"""
+    with tempfile.TemporaryDirectory() as tmp:
+        driver = os.path.join(tmp, 'chromedriver')
+        make_executable(driver)
+        cache_file = os.path.join(tmp, 'cache.json')
+        with open(cache_file, 'w') as f:
+            json.dump({'version': 'chrome-126', 'path': driver}, f)
+        monkeypatch.setattr(driver_resolver, 'DRIVER_CACHE_FILE', cache_file)
+        monkeypatch.delenv('CHROMEDRIVER_PATH', raising=False)
+        monkeypatch.delenv('CHROMEDRIVER_VERSION', raising=False)
+
+        monkeypatch.setattr(driver_resolver, 'installed_chrome_major', lambda: '126')
+        driver_resolver.resolve_chromedriver.cache_clear()
+        assert driver_resolver.resolve_chromedriver() == driver
+
+        assert driver_resolver._cache_key(None) == 'chrome-126'
+        monkeypatch.setattr(driver_resolver, 'installed_chrome_major', lambda: '127')
+        assert driver_resolver._read_cache(cache_file, driver_resolver._cache_key(None)) is None
+        monkeypatch.setattr(driver_resolver, 'installed_chrome_major', lambda: None)
+        assert driver_resolver._cache_key(None) is None
+    driver_resolver.resolve_chromedriver.cache_clear()
@@ -0,0 +1,136 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fastapi import HTTPException
+
+import xhs_metadata_api
+from fetch_guard import FetchGuard, CircuitBreaker, FetchRejected
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """/gone 返回404，/note 返回带meta标签的页面，/broken 返回502"""
+    hits = {}
+
+    def do_GET(self):
+        CountingHandler.hits[self.path] = CountingHandler.hits.get(self.path, 0) + 1
+        if self.path == '/note':
+            body = '<meta property="og:title" content="标题"><meta name="description" content="描述">'.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(404 if self.path == '/gone' else 502)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def do_HEAD(self):
+        key = ('HEAD', self.path)
+        CountingHandler.hits[key] = CountingHandler.hits.get(key, 0) + 1
+        self.send_response(200 if self.path == '/note' else 404 if self.path == '/gone' else 502)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_negative_cache_skips_refetch():
+    """确定性失败只请求一次，之后直接返回缓存的错误"""
+    server = start_server()
+    xhs_metadata_api.guard = FetchGuard()
+    url = f"http://127.0.0.1:{server.server_port}/gone"
+    try:
+        for _ in range(3):
+            try:
+                xhs_metadata_api.extract_metadata(url)
+                assert False, "应当抛出HTTPException"
+            except HTTPException as e:
+                assert e.status_code == 500
+                assert "404" in e.detail
+        assert CountingHandler.hits['/gone'] == 1
+
+        # 正常页面不受影响
+        metadata = xhs_metadata_api.extract_metadata(f"http://127.0.0.1:{server.server_port}/note")
+        assert metadata['title'] == '标题'
+    finally:
+        server.shutdown()
+
+
+def test_circuit_breaker_opens_and_probes():
+    """上游持续5xx时熔断，冷却后半开放行一次探测"""
+    server = start_server()
+    guard = FetchGuard(failure_threshold=2, recovery_timeout=0.2)
+    xhs_metadata_api.guard = guard
+    url = f"http://127.0.0.1:{server.server_port}/broken"
+    try:
+        for _ in range(2):
+            try:
+                xhs_metadata_api.extract_metadata(url)
+            except HTTPException:
+                pass
+        assert guard.breaker_for(url).state == CircuitBreaker.OPEN
+
+        start = time.perf_counter()
+        try:
+            xhs_metadata_api.extract_metadata(url)
+            assert False, "熔断时应当直接拒绝"
+        except HTTPException as e:
+            assert e.status_code == 503
+        assert time.perf_counter() - start < 0.01
+        assert CountingHandler.hits['/broken'] == 2
+
+        time.sleep(0.25)
+        assert guard.breaker_for(url).state == CircuitBreaker.HALF_OPEN
+        guard.check(url)  # 放行一个探测请求
+        try:
+            guard.check(url)
+            assert False, "半开状态只放行一个探测请求"
+        except FetchRejected:
+            pass
+        guard.record_success(url)
+        assert guard.breaker_for(url).state == CircuitBreaker.CLOSED
+    finally:
+        server.shutdown()
+
+
+def test_follow_redirect_classifies_status():
+    """失效的短链接进入负缓存，5xx计入熔断器"""
+    server = start_server()
+    xhs_metadata_api.guard = FetchGuard()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        for _ in range(2):
+            try:
+                xhs_metadata_api.follow_redirect(base + '/gone')
+                assert False, "应当抛出HTTPException"
+            except HTTPException as e:
+                assert "404" in e.detail
+        assert CountingHandler.hits[('HEAD', '/gone')] == 1
+
+        assert xhs_metadata_api.follow_redirect(base + '/note') == base + '/note'
+
+        xhs_metadata_api.guard = FetchGuard(failure_threshold=1)
+        try:
+            xhs_metadata_api.follow_redirect(base + '/broken')
+            assert False, "应当抛出HTTPException"
+        except HTTPException:
+            pass
+        assert xhs_metadata_api.guard.breaker_for(base + '/broken').state == CircuitBreaker.OPEN
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_negative_cache_skips_refetch()
+    test_follow_redirect_classifies_status()
+    test_circuit_breaker_opens_and_probes()
+    print("测试通过")
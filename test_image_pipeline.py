@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from image_pipeline import ImagePipeline
+
+
+def test_image_pipeline_manifest():
+    """图片下载后逐张提交处理，全部完成后写入 manifest.json"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = ImagePipeline(thumbnail_sizes=(64,), formats=('jpeg', 'webp'), workers=2)
+        try:
+            batch = pipeline.start_note(tmp)
+            for index, size in enumerate([(200, 100), (120, 300)], 1):
+                path = os.path.join(tmp, f"{index:03d}.webp")
+                Image.new('RGB', size, (index * 80, 20, 200)).save(path, 'WEBP')
+                batch.add(path)
+            broken = os.path.join(tmp, "003.webp")
+            with open(broken, 'wb') as f:
+                f.write(b"not an image")
+            batch.add(broken)
+            batch.close()
+            assert batch.wait(timeout=60)
+        finally:
+            pipeline.close()
+
+        with open(os.path.join(tmp, 'manifest.json'), encoding='utf-8') as f:
+            images = json.load(f)['images']
+        assert [image['file'] for image in images] == ['001.webp', '002.webp', '003.webp']
+        assert (images[0]['width'], images[0]['height']) == (200, 100)
+        assert len(images[0]['phash']) == 16
+        assert [(o['format'], o['width'], o['height']) for o in images[1]['outputs']] == [('jpeg', 26, 64), ('webp', 26, 64)]
+        assert all(os.path.exists(o['path']) for o in images[0]['outputs'])
+        assert 'error' in images[2]
+
+
+def test_manifest_written_when_submit_fails():
+    """进程池已关闭时提交失败，manifest.json 仍然写入并记录错误"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = ImagePipeline(workers=1)
+        pipeline.close()
+        batch = pipeline.start_note(tmp)
+        batch.add(os.path.join(tmp, "001.webp"))
+        batch.close()
+        assert batch.wait(timeout=5)
+
+        with open(os.path.join(tmp, 'manifest.json'), encoding='utf-8') as f:
+            images = json.load(f)['images']
+        assert images[0]['file'] == '001.webp' and 'error' in images[0]
+
+
+if __name__ == "__main__":
+    test_image_pipeline_manifest()
+    test_manifest_written_when_submit_fails()
+    print("测试通过")
@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+from fastapi.testclient import TestClient
+
+import media_server
+from app import app
+
+
+def test_media_range_and_etag():
+    """支持Range请求，重复请求返回304，拒绝目录穿越"""
+    with tempfile.TemporaryDirectory() as tmp:
+        note_dir = os.path.join(tmp, '在东京随地大小NewJeans')
+        os.makedirs(note_dir)
+        data = os.urandom(300 * 1024)
+        path = os.path.join(note_dir, '001.webp')
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        original_root = media_server.MEDIA_ROOT
+        media_server.MEDIA_ROOT = tmp
+        try:
+            client = TestClient(app)
+            url = media_server.media_url(path)
+            assert url.startswith('/media/%E5%9C%A8')
+
+            response = client.get(url)
+            assert response.status_code == 200
+            assert response.content == data
+            assert response.headers['content-type'] == 'image/webp'
+            etag = response.headers['etag']
+
+            assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+            response = client.get(url, headers={'Range': 'bytes=1000-1999'})
+            assert response.status_code == 206
+            assert response.headers['content-range'] == f'bytes 1000-1999/{len(data)}'
+            assert response.content == data[1000:2000]
+
+            response = client.get(url, headers={'Range': 'bytes=-10'})
+            assert response.content == data[-10:]
+
+            # If-Range不匹配时返回完整文件
+            response = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+            assert response.status_code == 200 and len(response.content) == len(data)
+
+            assert client.get(url, headers={'Range': f'bytes={len(data)}-'}).status_code == 416
+            assert client.head(url).headers['content-length'] == str(len(data))
+            assert client.get('/media/../app.py').status_code == 404
+            assert client.get('/media/%2E%2E/app.py').status_code == 404
+
+            # 空文件无法满足任何范围
+            empty = os.path.join(note_dir, '002.webp')
+            open(empty, 'wb').close()
+            response = client.get(media_server.media_url(empty), headers={'Range': 'bytes=-10'})
+            assert response.status_code == 416
+        finally:
+            media_server.MEDIA_ROOT = original_root
+
+
+if __name__ == "__main__":
+    test_media_range_and_etag()
+    print("测试通过")
@@ -0,0 +1,80 @@
+import requests
+
+import http_client
+from load_test import percentile, print_scaling, summarize
+from mock_xhs_server import MockConfig, generate_notes, start_mock_server
+
+
+def use_mock(monkeypatch, base_url):
+    monkeypatch.setenv('XHS_MOCK_UPSTREAM', base_url)
+    monkeypatch.setattr(http_client, '_session', None)
+
+
+def test_extractors_use_mock_server(monkeypatch):
+    """设置 XHS_MOCK_UPSTREAM 后，HTTP提取流程访问模拟服务器，调用方看到的仍然是小红书URL"""
+    from xhs_metadata_api import extract_metadata, follow_redirect
+
+    notes = generate_notes(3, seed=1)
+    server, base_url = start_mock_server(notes, MockConfig())
+    try:
+        use_mock(monkeypatch, base_url)
+        note = notes[0]
+        final_url = follow_redirect(f"http://xhslink.com/a/{note['short_code']}")
+        assert final_url == f"https://www.xiaohongshu.com/discovery/item/{note['note_id']}"
+
+        metadata = extract_metadata(final_url)
+        assert metadata['title'] == note['title']
+        assert metadata['description'] == note['description']
+        assert [url.rsplit('/', 1)[1].split('!')[0] for url in metadata['image_urls']] == note['images']
+
+        # 浏览器直接访问时，页面中的链接指向模拟服务器
+        page = requests.get(http_client.upstream_url(final_url)).text
+        assert f"{base_url}/_host/sns-webpic-qc.xhscdn.com/" in page
+        assert server.stats['short_link'] == 1
+    finally:
+        server.shutdown()
+    monkeypatch.setattr(http_client, '_session', None)
+
+
+def test_rate_limit_and_errors():
+    notes = generate_notes(1)
+    server, base_url = start_mock_server(notes, MockConfig(rate_limit=1, burst=2))
+    try:
+        page = f"{base_url}/_host/www.xiaohongshu.com/explore/{notes[0]['note_id']}"
+        statuses = [requests.get(page).status_code for _ in range(4)]
+        assert statuses[:2] == [200, 200]
+        assert 429 in statuses[2:]
+    finally:
+        server.shutdown()
+
+    server, base_url = start_mock_server(notes, MockConfig(error_rate=1.0))
+    try:
+        assert requests.get(f"{base_url}/_host/www.xiaohongshu.com/").status_code == 500
+        assert requests.get(f"{base_url}/_fixtures").json()['notes'][0]['note_id'] == notes[0]['note_id']
+    finally:
+        server.shutdown()
+
+
+def test_summarize():
+    assert percentile([], 50) is None
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    summary = summarize(4, [(0.1, 200), (0.2, 200), (0.3, 500), (1.0, None)], 2.0)
+    assert summary['ok'] == 2
+    assert summary['errors'] == {'500': 1, 'None': 1}
+    assert summary['throughput'] == 1.0
+    assert summary['p50_ms'] == 100.0
+
+
+def test_print_scaling():
+    runs = [{'workers': 1, 'levels': [{'throughput': 1.0}, {'throughput': 2.0}]},
+            {'workers': 4, 'levels': [{'throughput': 6.0}]}]
+    print_scaling(runs)
+    assert runs[0]['efficiency'] == 1.0
+    assert runs[1]['peak_throughput'] == 6.0 and runs[1]['efficiency'] == 0.75
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,89 @@
+import os
+import tempfile
+
+from note_watcher import NoteWatcher, author_id_from_url, note_fingerprint
+
+
+NOTE_ID = '6800a1b2c3d4e5f6a7b8c9d0'
+TOKEN_A = '1040g2sg314m097hp6g705p9j9o7aj4jb75acl70'
+TOKEN_B = '1040g2sg314m097hp6g805p9j9o7aj4jbd08bsvg'
+TOKEN_C = '1040g2sg314m097hp6g905p9j9o7aj4jb1kd2k0g'
+
+
+def image(token, signature='0' * 32):
+    return f"http://sns-webpic-qc.xhscdn.com/202504201457/{signature}/{token}!nd_dft_wlteh_webp_3"
+
+
+def test_note_fingerprint_ignores_url_signatures():
+    first = {'title': 't', 'description': 'd', 'image_urls': [image(TOKEN_A), image(TOKEN_B)]}
+    second = {'title': 't', 'description': 'd', 'image_urls': [image(TOKEN_B, 'f' * 32), image(TOKEN_A)]}
+    assert note_fingerprint(first) == note_fingerprint(second)
+    assert note_fingerprint(first) != note_fingerprint(dict(first, title='t2'))
+    assert author_id_from_url('https://www.xiaohongshu.com/user/profile/5f1a2b3c?xsec_source=pc') == '5f1a2b3c'
+    assert author_id_from_url(f'https://www.xiaohongshu.com/explore/{NOTE_ID}') is None
+
+
+def test_full_scrape_only_when_fingerprint_changes():
+    pages = {'title': '标题', 'description': '正文', 'image_urls': [image(TOKEN_A)]}
+    scraped = []
+    fail_scrape = []
+
+    def full_scrape(url):
+        if fail_scrape:
+            raise RuntimeError("浏览器不可用")
+        scraped.append(url)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        watcher = NoteWatcher(os.path.join(tmp, 'watch.db'), full_scrape=full_scrape,
+                              fetch_note=lambda url: dict(pages), initial_interval=1000,
+                              min_interval=100, max_interval=10000)
+        url = f'https://www.xiaohongshu.com/explore/{NOTE_ID}'
+        assert watcher.add(url)['key'] == NOTE_ID
+
+        # 第一次检查建立基线并完整抓取，间隔不变
+        assert watcher.run_due() == [{'kind': 'note', 'key': NOTE_ID, 'changed': True}]
+        assert scraped == [url]
+        assert watcher.get('note', NOTE_ID)['interval'] == 1000
+
+        # 没有变化：不抓取，间隔变长
+        far_future = 10 ** 12
+        assert watcher.run_due(now=far_future)[0]['changed'] is False
+        assert scraped == [url]
+        assert watcher.get('note', NOTE_ID)['interval'] == 1500
+
+        # 内容变化但完整抓取失败：不更新指纹，下次重试
+        pages['image_urls'] = pages['image_urls'] + [image(TOKEN_C)]
+        fail_scrape.append(True)
+        assert 'error' in watcher.run_due(now=far_future)[0]
+        assert watcher.get('note', NOTE_ID)['failures'] == 1
+        fail_scrape.clear()
+        assert watcher.run_due(now=far_future)[0]['changed'] is True
+        assert scraped == [url, url]
+        item = watcher.get('note', NOTE_ID)
+        assert item['interval'] == 750 and item['changes'] == 2 and item['failures'] == 0
+        watcher.stop()
+
+
+def test_author_new_notes_are_watched():
+    profile = ['6800a1b2c3d4e5f6a7b8c9d1', '6800a1b2c3d4e5f6a7b8c9d2']
+    with tempfile.TemporaryDirectory() as tmp:
+        watcher = NoteWatcher(os.path.join(tmp, 'watch.db'), fetch_author_notes=lambda url: list(profile),
+                              fetch_note=lambda url: {'title': url})
+        watcher.add('https://www.xiaohongshu.com/user/profile/5f1a2b3c')
+
+        # 第一次检查只记录基线
+        assert watcher.run_due()[0]['new_notes'] == []
+        assert watcher.list_watches('note') == []
+
+        profile.insert(0, '6800a1b2c3d4e5f6a7b8c9d3')
+        result = watcher.run_due(now=10 ** 12)[0]
+        assert result['changed'] is True and result['new_notes'] == ['6800a1b2c3d4e5f6a7b8c9d3']
+        assert [item['key'] for item in watcher.list_watches('note')] == ['6800a1b2c3d4e5f6a7b8c9d3']
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    test_note_fingerprint_ignores_url_signatures()
+    test_full_scrape_only_when_fingerprint_changes()
+    test_author_new_notes_are_watched()
+    print("所有测试通过")
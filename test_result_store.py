@@ -0,0 +1,51 @@
+import os
+import tempfile
+import threading
+import time
+
+from result_store import ResultStore
+
+
+def test_result_store_query():
+    """批量写入后可以按笔记ID、短链接、作者和时间查询，且保留历史"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, 'results.db'), batch_size=50)
+        try:
+            store.add({
+                'title': '第一次',
+                'description': '',
+                'image_urls': [],
+                'original_url': 'http://xhslink.com/a/IGTNc5Db7WEab',
+                'extracted_url': 'https://www.xiaohongshu.com/explore/66815879000000001c02a2d7',
+            }, fetched_at=1000.0)
+            store.add({'title': '第二次', 'author': '拓麻慧子',
+                       'url': 'http://xhslink.com/a/IGTNc5Db7WEab',
+                       'extracted_url': 'https://www.xiaohongshu.com/explore/66815879000000001c02a2d7'},
+                      fetched_at=2000.0)
+
+            def add_many(offset):
+                for i in range(100):
+                    store.add({'title': f'其他{offset + i}', 'url': f'https://www.xiaohongshu.com/explore/{offset + i:024d}'})
+
+            threads = [threading.Thread(target=add_many, args=(n * 100,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert store.flush(timeout=10)
+
+            latest = store.get_latest(note_id='66815879000000001c02a2d7')
+            assert latest['title'] == '第二次'
+            assert latest['short_url'] == 'http://xhslink.com/a/IGTNc5Db7WEab'
+            assert [r['title'] for r in store.query(short_url='http://xhslink.com/a/IGTNc5Db7WEab')] == ['第二次', '第一次']
+            assert [r['title'] for r in store.query(author='拓麻慧子')] == ['第二次']
+            assert [r['data']['title'] for r in store.query(until=1500.0)] == ['第一次']
+            assert len(store.query(since=time.time() - 60, limit=1000)) == 400
+            assert store.get_latest(note_id='66815879000000001c02a2d7', max_age=60) is None
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    test_result_store_query()
+    print("测试通过")
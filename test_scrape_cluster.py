@@ -0,0 +1,95 @@
+import os
+import time
+
+import pytest
+
+from scrape_cluster import ScrapeCluster, WorkerCrashed, WorkerUnavailable
+
+
+class FakeScraper:
+    """不启动浏览器，返回处理任务的进程号"""
+
+    def scrape_post(self, url, image_variant=None):
+        if url.endswith('crash'):
+            os._exit(1)
+        return {'url': url, 'pid': os.getpid()}
+
+    def login(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def fake_factory(worker_count):
+    return FakeScraper()
+
+
+def broken_factory(worker_count):
+    raise RuntimeError("chromedriver不存在")
+
+
+def note_url(note_id):
+    return f"https://www.xiaohongshu.com/explore/{note_id}"
+
+
+def wait_ready(cluster, count, timeout=30):
+    deadline = time.time() + timeout
+    while cluster.status()['ready'] < count:
+        assert time.time() < deadline, cluster.status()
+        time.sleep(0.1)
+
+
+def test_same_note_goes_to_same_worker():
+    cluster = ScrapeCluster(2, scraper_factory=fake_factory, resolve_short_links=False).start()
+    try:
+        wait_ready(cluster, 2)
+        note_ids = [f"{i:024x}" for i in range(20)]
+        first = {note_id: cluster.submit_scrape(note_url(note_id)).result(30)['pid'] for note_id in note_ids}
+        again = {note_id: cluster.submit_scrape(note_url(note_id) + '?xsec_source=pc').result(30)['pid']
+                 for note_id in note_ids}
+        assert first == again
+        assert len(set(first.values())) == 2
+        assert cluster.submit_login().result(30) is True
+    finally:
+        cluster.close()
+
+
+def test_crashed_worker_is_restarted():
+    cluster = ScrapeCluster(1, scraper_factory=fake_factory, resolve_short_links=False).start()
+    try:
+        wait_ready(cluster, 1)
+        with pytest.raises(WorkerCrashed):
+            cluster.submit_scrape('https://example.com/crash').result(30)
+        assert cluster.status()['busy'] == 0
+        result = cluster.submit_scrape(note_url('a' * 24)).result(30)
+        assert result['url'] == note_url('a' * 24)
+        assert cluster.status()['alive'] == 1
+    finally:
+        cluster.close()
+
+
+def test_worker_that_cannot_start_fails_jobs_and_gives_up():
+    cluster = ScrapeCluster(1, scraper_factory=broken_factory, resolve_short_links=False,
+                            max_start_failures=2, max_restart_delay=0).start()
+    try:
+        # 排队的任务随启动失败一起失败，而不是一直等待
+        with pytest.raises(WorkerCrashed):
+            cluster.submit_scrape(note_url('a' * 24)).result(30)
+
+        deadline = time.time() + 30
+        while not cluster.status()['given_up']:
+            assert time.time() < deadline, cluster.status()
+            time.sleep(0.1)
+        assert cluster.status()['alive'] == 0
+        with pytest.raises(WorkerUnavailable):
+            cluster.submit_scrape(note_url('b' * 24)).result(1)
+    finally:
+        cluster.close()
+
+
+if __name__ == "__main__":
+    test_same_note_goes_to_same_worker()
+    test_crashed_worker_is_restarted()
+    test_worker_that_cannot_start_fails_jobs_and_gives_up()
+    print("所有测试通过")
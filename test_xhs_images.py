@@ -0,0 +1,40 @@
+from xhs_images import parse_image_url, dedupe_image_urls, normalize_image_url, image_extension
+
+
+SIGNED = "http://sns-webpic-qc.xhscdn.com/202504201457/09df8e8378a94bc6b0800fde25b62991/1040g2sg314m097hp6g705p9j9o7aj4jb75acl70!nd_dft_wlteh_webp_3"
+RESIGNED = "http://sns-webpic-qc.xhscdn.com/202504211030/411d38c203c5ae564fde9471ac425e58/1040g2sg314m097hp6g705p9j9o7aj4jb75acl70!nd_prv_wlteh_webp_3"
+OTHER = "http://sns-webpic-qc.xhscdn.com/202504201457/cecc0f0755aa1bbc51bdf1dea0d0d51d/1040g2sg314m097hp6g805p9j9o7aj4jbd08bsvg!nd_dft_wlteh_webp_3"
+
+
+def test_parse_and_dedupe():
+    """同一张图片不同签名/规格只保留一个，并可以转换为指定规格"""
+    ref = parse_image_url(SIGNED)
+    assert ref.token == "1040g2sg314m097hp6g705p9j9o7aj4jb75acl70"
+    assert ref.spec == "nd_dft_wlteh_webp_3"
+    assert parse_image_url("https://example.com/a.jpg") is None
+    # 头像、页面链接等不是笔记图片，转换规格时原样保留
+    avatar = "https://sns-avatar-qc.xhscdn.com/avatar/1040g2jo30s5ob0j2mk005ncgi9pl5rnb9m1mhig?imageView2/2/w/80/format/jpg"
+    page = "https://www.xiaohongshu.com/explore/6800a1b2c3d4e5f6a7b8c9d0"
+    emoji = "https://ci.xiaohongshu.com/emoji/smile.png"
+    for url in (avatar, page, emoji):
+        assert parse_image_url(url) is None
+        assert normalize_image_url(url, 'thumbnail') == url
+
+    assert dedupe_image_urls([SIGNED, RESIGNED, OTHER, "https://example.com/a.jpg"]) == [
+        SIGNED, OTHER, "https://example.com/a.jpg"]
+    assert dedupe_image_urls([SIGNED, RESIGNED], variant='thumbnail') == [
+        "https://ci.xiaohongshu.com/1040g2sg314m097hp6g705p9j9o7aj4jb75acl70?imageView2/2/w/360/format/webp"]
+    # 已经规范化的URL可以再次解析出同一个token
+    assert parse_image_url(normalize_image_url(SIGNED, 'original')).token == ref.token
+
+
+def test_image_extension():
+    assert image_extension(SIGNED) == '.webp'
+    assert image_extension(normalize_image_url(SIGNED, 'original')) == '.jpg'
+    assert image_extension("https://example.com/a.png") == '.png'
+
+
+if __name__ == "__main__":
+    test_parse_and_dedupe()
+    test_image_extension()
+    print("测试通过")
@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+from xhs_links import XHSLink, find_first_link, extract_links, scan_file, note_id_from_url
+
+
+SHARE_TEXT = "34 拓麻慧子发布了一篇小红书笔记，快来看吧！ 😆 tnk9IKuwcqYQnJK 😆 http://xhslink.com/a/IGTNc5Db7WEab，复制本条信息，打开【小红书】App查看精彩内容！"
+LONG_TEXT = "看这个 https://www.xiaohongshu.com/explore/66815879000000001c02a2d7?xsec_token=AB1x&xsec_source=pc_share。还有 https://xhslink.com/m/3zWq 呢"
+
+
+def test_extract_links():
+    """短链接在全角逗号处截断，长链接带笔记ID"""
+    assert find_first_link(SHARE_TEXT) == XHSLink("http://xhslink.com/a/IGTNc5Db7WEab", None, True)
+    assert list(extract_links([LONG_TEXT, "没有链接", SHARE_TEXT])) == [
+        XHSLink("https://www.xiaohongshu.com/explore/66815879000000001c02a2d7?xsec_token=AB1x&xsec_source=pc_share",
+                "66815879000000001c02a2d7", False),
+        XHSLink("https://xhslink.com/m/3zWq", None, True),
+        XHSLink("http://xhslink.com/a/IGTNc5Db7WEab", None, True),
+    ]
+    assert note_id_from_url("https://www.xiaohongshu.com/discovery/item/66815879000000001c02a2d7") == "66815879000000001c02a2d7"
+    assert find_first_link("https://example.com/a/b") is None
+
+
+def test_scan_file_parallel():
+    """多进程扫描的结果与逐行提取一致，且保持文件顺序"""
+    lines = [SHARE_TEXT if i % 3 else LONG_TEXT for i in range(3000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dump.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        expected = list(extract_links(lines))
+        assert list(scan_file(path, workers=2, chunk_size=16 * 1024)) == expected
+        assert list(scan_file(path, workers=1)) == expected
+
+
+if __name__ == "__main__":
+    test_extract_links()
+    test_scan_file_parallel()
+    print("测试通过")
@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+
+import requests
+
+from bench_video_download import start_range_server
+from xhs_video import extract_video_url, download_video
+
+
+def test_extract_video_url():
+    html = '<script>window.__INITIAL_STATE__={"video":{"media":{"stream":{"h264":[{"masterUrl":"http:\\u002F\\u002Fsns-video-bd.xhscdn.com\\u002Fstream\\u002F110\\u002Fabc.mp4"}]}}}}</script>'
+    assert extract_video_url(html) == "http://sns-video-bd.xhscdn.com/stream/110/abc.mp4"
+    assert extract_video_url('<meta name="og:video" content="http://sns-video-bd.xhscdn.com/a.mp4">') == "http://sns-video-bd.xhscdn.com/a.mp4"
+    assert extract_video_url('<meta name="og:image" content="http://x/y">') is None
+
+
+def test_download_video_segments_and_resume():
+    """分段并行下载结果与源文件一致，并能从中断的分段继续"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.mp4')
+        data = os.urandom(1024 * 1024 + 123)
+        with open(source, 'wb') as f:
+            f.write(data)
+        server, url = start_range_server(source)
+        try:
+            target = os.path.join(tmp, 'video.mp4')
+            download_video(url, target, workers=4, segment_size=100 * 1024, session=requests.Session())
+            with open(target, 'rb') as f:
+                assert f.read() == data
+            assert not os.path.exists(target + '.part.json')
+
+            # 模拟中断：第0段已完成，第1段写了一半，其余为错误数据
+            resumed = os.path.join(tmp, 'resumed.mp4')
+            segment_size = 100 * 1024
+            with open(resumed + '.part', 'wb') as f:
+                f.write(data[:segment_size + 5000] + b'\0' * (len(data) - segment_size - 5000))
+            with open(resumed + '.part.json', 'w') as f:
+                json.dump({'url': url, 'size': len(data), 'segment_size': segment_size,
+                           'written': {'0': segment_size, '1': 5000}}, f)
+            download_video(url, resumed, workers=4, segment_size=segment_size, session=requests.Session())
+            with open(resumed, 'rb') as f:
+                assert f.read() == data
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    test_extract_video_url()
+    test_download_video_segments_and_resume()
+    print("测试通过")
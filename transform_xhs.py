@@ -1,52 +1,88 @@
 import requests
 from typing import Optional, Dict, Any, List
 import logging
-import re
 
-from bs4 import BeautifulSoup
+from xhs_links import find_first_link, GENERIC_URL_RE
+from xhs_images import dedupe_image_urls
+from xhs_video import extract_video_url
+from http_client import get_session
+from cookie_store import get_cookie_store
+from fetch_guard import guard, FetchRejected, LoginRequiredError, is_login_redirect, is_deterministic_failure
 
 
 LOGGER = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
 
 def extract_url(pasted_text):
-    url_pattern = r"(https?://[^，\s]+)"
-    match = re.search(url_pattern, pasted_text)
-    return match.group(1) if match else None
+    link = find_first_link(pasted_text)
+    if link:
+        return link.url
+    match = GENERIC_URL_RE.search(pasted_text)
+    return match.group(0) if match else None
 
 
 def get_final_url(short_url):
     try:
-        response = requests.get(short_url, allow_redirects=True)
+        guard.check(short_url)
+        response = get_session().get(short_url, allow_redirects=True)
         response.raise_for_status()
+        guard.record_success(short_url)
         return response.url
+    except FetchRejected as e:
+        LOGGER.info(f"Rejected without fetching: {e.detail}")
+        return None
     except requests.RequestException as e:
         LOGGER.error(f"An error occurred: {e}")
+        guard.record_failure(short_url, "Failed to get the final URL", is_deterministic_failure(e), 400)
         return None
 
 
 def extract_xhs_content(pasted_text: str) -> Optional[Dict[str, Any]]:
     """提取小红书内容"""
+    # BeautifulSoup导入较慢，只在真正解析页面时加载
+    from bs4 import BeautifulSoup
+
     try:
         short_url = extract_url(pasted_text)
         if not short_url:
             return {"error": "Failed to extract URL from pasted text"}
 
+        # 负缓存命中时直接返回上次的错误，不再跟踪重定向
+        cached = guard.negative_cache.get(short_url)
+        if cached:
+            return {"error": cached[1]}
+
         # 提取完整 URL
         final_url = get_final_url(short_url)
         if not final_url:
             return {"error": "Failed to get the final URL"}
 
-        response = requests.get(final_url)
+        try:
+            guard.check(final_url)
+            response = get_session().get(final_url)
+            response.raise_for_status()
+            if is_login_redirect(response.url):
+                get_cookie_store().mark_stale()
+                raise LoginRequiredError(f"Login required: {response.url}")
+            guard.record_success(final_url)
+        except FetchRejected as e:
+            return {"error": e.detail}
+        except (requests.RequestException, LoginRequiredError) as e:
+            LOGGER.error(f"Failed to fetch {final_url}: {e}")
+            detail = f"Failed to fetch the note page: {e}"
+            guard.record_failure(final_url, detail, is_deterministic_failure(e), 400)
+            guard.alias_failure(short_url, final_url)
+            return {"error": detail}
+
         soup = BeautifulSoup(response.text, "html.parser")
 
         is_video = bool(soup.find("div", class_=["player-el"]))
         LOGGER.info(f"Is video: {is_video}")
+        video_url = extract_video_url(response.text) if is_video else None
         
         # 收集所有图片URL
         image_tags = soup.find_all("meta", attrs={"name": "og:image"})
-        image_urls = [tag["content"] for tag in image_tags if "content" in tag.attrs]
+        image_urls = dedupe_image_urls(tag["content"] for tag in image_tags if "content" in tag.attrs)
         
         # 尝试获取标题和描述
         title_tag = soup.find("meta", attrs={"name": "og:title"})
@@ -61,7 +97,8 @@ def extract_xhs_content(pasted_text: str) -> Optional[Dict[str, Any]]:
             "title": title, 
             "images": image_urls,  # 直接返回URL列表，不处理为base64
             "description": description,
-            "original_url": final_url
+            "original_url": final_url,
+            "video_url": video_url
         }
     
     except Exception as e:
@@ -0,0 +1,120 @@
+"""
+小红书CDN图片URL的解析与规范化
+
+页面中的 og:image 形如:
+    http://sns-webpic-qc.xhscdn.com/202504201457/09df8e8378a94bc6b0800fde25b62991/1040g2sg314m097hp6g705p9j9o7aj4jb75acl70!nd_dft_wlteh_webp_3
+其中 202504201457 是时间戳，09df...2991 是签名，二者每次打开页面都会变化；
+1040g2sg... 才是图片本身的稳定标识（token），! 之后是尺寸/格式规格。
+
+这里按token去重，并可以按需要选择目标规格（缩略图、webp、原图），
+只需要缩略图的调用方可以少传输大部分字节。
+"""
+import os
+import re
+from typing import Iterable, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+
+# 时间戳 + 签名前缀
+_SIGNED_PREFIX_RE = re.compile(r'^/\d{12}/[0-9a-f]{32}/')
+
+# 以token为基础构造的规格，{token} 会被替换
+VARIANT_TEMPLATES = {
+    'original': 'https://ci.xiaohongshu.com/{token}',
+    'webp': 'https://ci.xiaohongshu.com/{token}?imageView2/2/w/1080/format/webp',
+    'thumbnail': 'https://ci.xiaohongshu.com/{token}?imageView2/2/w/360/format/webp',
+}
+
+XHS_IMAGE_HOST_SUFFIXES = ('xhscdn.com', 'xiaohongshu.com')
+
+# 只有笔记图片所在的主机才按token处理，头像（sns-avatar*）、表情、页面链接等原样保留
+NOTE_IMAGE_HOST_PREFIXES = ('sns-webpic', 'sns-img', 'ci.')
+
+# 笔记图片token：可选的目录前缀 + 较长的字母数字串
+_TOKEN_RE = re.compile(r'^(?:(?:spectrum|notes_pre_post|notes_uhdr)/)?[0-9a-z]{20,}$')
+
+
+class ImageRef(NamedTuple):
+    token: str
+    spec: Optional[str]  # ! 之后的规格，例如 nd_dft_wlteh_webp_3
+    url: str
+
+
+def parse_image_url(url) -> Optional[ImageRef]:
+    """
+    解析小红书CDN图片URL
+
+    Args:
+        url (str): 图片URL
+
+    Returns:
+        ImageRef: 不是小红书笔记图片时返回None
+    """
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if not host.endswith(XHS_IMAGE_HOST_SUFFIXES) or not host.startswith(NOTE_IMAGE_HOST_PREFIXES):
+        return None
+    path = _SIGNED_PREFIX_RE.sub('/', parsed.path)
+    path, _, spec = path.partition('!')
+    token = path.strip('/')
+    if not _TOKEN_RE.match(token):
+        return None
+    return ImageRef(token, spec or None, url)
+
+
+def image_key(url):
+    """用于去重的稳定键：小红书图片取token，其他图片取URL本身"""
+    ref = parse_image_url(url)
+    return ref.token if ref else url
+
+
+def normalize_image_url(url, variant=None):
+    """
+    把图片URL转换为指定规格
+
+    Args:
+        url (str): 页面中的图片URL
+        variant (str): 'original'、'webp'、'thumbnail'，None表示保持页面中的URL
+
+    Returns:
+        str: 转换后的URL，无法识别的图片原样返回
+    """
+    if variant is None:
+        return url
+    if variant not in VARIANT_TEMPLATES:
+        raise ValueError(f"不支持的图片规格: {variant}，可选: {', '.join(VARIANT_TEMPLATES)}")
+    ref = parse_image_url(url)
+    if ref is None:
+        return url
+    return VARIANT_TEMPLATES[variant].format(token=ref.token)
+
+
+def dedupe_image_urls(urls: Iterable[str], variant=None) -> List[str]:
+    """
+    按图片token去重（保留第一次出现的顺序），并转换为指定规格
+
+    同一张图片带不同签名或不同尺寸规格时只保留一个。
+    """
+    seen = set()
+    result = []
+    for url in urls:
+        key = image_key(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        result.append(normalize_image_url(url, variant))
+    return result
+
+
+def image_extension(url, default='.jpg'):
+    """根据URL推断文件扩展名，支持 !xxx_webp_3 和 format/webp 这类写法"""
+    parsed = urlparse(url)
+    path, _, spec = parsed.path.partition('!')
+    ext = os.path.splitext(path)[1]
+    if ext:
+        return ext
+    hint = f"{spec} {parsed.query}".lower()
+    for fmt in ('webp', 'png', 'jpeg', 'jpg', 'gif', 'heic'):
+        if fmt in hint:
+            return '.jpg' if fmt == 'jpeg' else f'.{fmt}'
+    return default
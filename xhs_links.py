@@ -0,0 +1,180 @@
+"""
+统一的小红书链接提取
+
+从分享文本、聊天记录、评论导出等文本中批量提取小红书短链接（xhslink.com）和长链接
+（xiaohongshu.com/explore/<note_id> 等），长链接同时给出笔记ID。
+
+- iter_links / find_first_link: 处理单段文本
+- extract_links: 处理任意可迭代的文本行
+- scan_file: 对大文件做内存映射，按行边界切块后用进程池并行扫描
+
+命令行用法（统计吞吐量，单位MB/s）:
+    python xhs_links.py dump.txt --workers 8 -o links.jsonl
+"""
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+
+# 只匹配ASCII字符，遇到全角标点（如“，”）、空白、引号等自然停止
+_LINK_PATTERN = (
+    r'https?://(?:'
+    r'(?P<short>xhslink\.com(?:/[A-Za-z0-9]+)+)'
+    r'|(?:www\.)?xiaohongshu\.com/(?:explore|discovery/item|user/profile/[0-9A-Za-z]+)/(?P<note_id>[0-9A-Za-z]+)'
+    r'(?:\?[A-Za-z0-9\-._~%&=+:/]*)?'
+    r')'
+)
+LINK_RE = re.compile(_LINK_PATTERN)
+LINK_RE_BYTES = re.compile(_LINK_PATTERN.encode('ascii'))
+
+# 找不到小红书链接时使用的通用URL模式
+GENERIC_URL_RE = re.compile(r'https?://[^\s，。！？、；：“”‘’（）【】《》"\'<>]+')
+
+# 单个进程处理的块大小
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+class XHSLink(NamedTuple):
+    url: str
+    note_id: Optional[str]  # 短链接在跟踪重定向之前无法得知笔记ID
+    is_short: bool
+
+
+def _to_link(match):
+    note_id = match.group('note_id')
+    return XHSLink(match.group(0), note_id, note_id is None)
+
+
+def _to_link_bytes(match):
+    note_id = match.group('note_id')
+    return XHSLink(match.group(0).decode('ascii'), note_id.decode('ascii') if note_id else None, note_id is None)
+
+
+def iter_links(text) -> Iterator[XHSLink]:
+    """提取一段文本中的所有小红书链接"""
+    for match in LINK_RE.finditer(text):
+        yield _to_link(match)
+
+
+def find_first_link(text) -> Optional[XHSLink]:
+    """
+    提取文本中的第一个小红书链接
+
+    Args:
+        text (str): 用户输入的文本，例如：
+        "34 拓麻慧子发布了一篇小红书笔记，快来看吧！😆 tnk9IKuwcqYQnJK 😆 http://xhslink.com/a/IGTNc5Db7WEab"
+
+    Returns:
+        XHSLink: 未找到则返回None
+    """
+    match = LINK_RE.search(text)
+    return _to_link(match) if match else None
+
+
+def note_id_from_url(url) -> Optional[str]:
+    """从长链接中取出笔记ID，短链接或无法识别时返回None"""
+    match = LINK_RE.match(url)
+    return match.group('note_id') if match else None
+
+
+def extract_links(lines: Iterable[str]) -> Iterator[XHSLink]:
+    """从任意可迭代的文本行中批量提取链接"""
+    finditer = LINK_RE.finditer
+    for line in lines:
+        for match in finditer(line):
+            yield _to_link(match)
+
+
+def _split_ranges(path, chunk_size):
+    """按换行符把文件切成若干块，保证链接不会跨块"""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _scan_range(path, start, end):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return [_to_link_bytes(match) for match in LINK_RE_BYTES.finditer(mm, start, end)]
+
+
+def scan_file(path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[XHSLink]:
+    """
+    扫描大文件中的所有小红书链接，按文件中的顺序返回
+
+    Args:
+        path (str): 文本文件路径
+        workers (int): 进程数，默认使用全部CPU核心
+        chunk_size (int): 每个任务处理的字节数
+
+    Returns:
+        Iterator[XHSLink]: 链接迭代器
+    """
+    if os.path.getsize(path) == 0:
+        return
+    ranges = _split_ranges(path, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    if len(ranges) == 1 or workers == 1:
+        for start, end in ranges:
+            yield from _scan_range(path, start, end)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 限制已提交的任务数量，避免结果堆积在内存中
+        pending = deque()
+        ranges = iter(ranges)
+        for start, end in ranges:
+            pending.append(executor.submit(_scan_range, path, start, end))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            yield from pending.popleft().result()
+            for start, end in ranges:
+                pending.append(executor.submit(_scan_range, path, start, end))
+                break
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="从大文本文件中提取小红书链接并统计吞吐量")
+    parser.add_argument('path', help="文本文件路径")
+    parser.add_argument('--workers', type=int, help="进程数，默认使用全部CPU核心")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="每个任务处理的字节数")
+    parser.add_argument('-o', '--output', help="把链接写入JSONL文件")
+    args = parser.parse_args(argv)
+
+    size = os.path.getsize(args.path)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else None
+    count = 0
+    started = time.perf_counter()
+    try:
+        for link in scan_file(args.path, workers=args.workers, chunk_size=args.chunk_size):
+            count += 1
+            if out:
+                out.write(json.dumps(link._asdict(), ensure_ascii=False) + '\n')
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - started
+    rate = size / (1024 * 1024) / elapsed if elapsed else 0.0
+    print(f"扫描 {size / (1024 * 1024):.1f} MB，找到 {count} 个链接，用时 {elapsed:.2f} 秒，{rate:.1f} MB/s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
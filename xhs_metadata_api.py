@@ -1,19 +1,32 @@
+import os
 import re
 import json
 import requests
 from bs4 import BeautifulSoup
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional, Literal
 import uvicorn
 
+from xhs_links import find_first_link, note_id_from_url
+from xhs_images import dedupe_image_urls
+from result_store import get_store
+from http_client import get_session
+from cookie_store import get_cookie_store
+from fetch_guard import guard, FetchRejected, LoginRequiredError, is_login_redirect, is_deterministic_failure
+
 # 创建FastAPI实例
 app = FastAPI(title="小红书元数据抓取API", description="从小红书链接中提取标题、描述和图片URL的API")
 
+# 结果库中已保存结果的有效期（秒），超过后重新抓取
+CACHE_MAX_AGE = float(os.environ.get('XHS_EXTRACT_CACHE_TTL') or 24 * 3600)
+
 # 定义请求模型
 class XHSLinkRequest(BaseModel):
     input_text: str
+    refresh: bool = False  # 忽略本地结果库，强制重新抓取
+    image_variant: Optional[Literal['original', 'webp', 'thumbnail']] = None  # 图片规格，默认保持页面中的URL
 
 # 定义响应模型
 class XHSMetadataResponse(BaseModel):
@@ -38,15 +51,8 @@ def extract_xiaohongshu_url(input_text):
     Returns:
         str: 提取出的URL，如果未找到则返回None
     """
-    # 匹配 http://xhslink.com/a/ 开头的完整URL
-    pattern = r'http://xhslink\.com/[a-zA-Z0-9/]+'
-    match = re.search(pattern, input_text)
-    
-    if match:
-        url = match.group(0)
-        return url
-        
-    return None
+    link = find_first_link(input_text)
+    return link.url if link else None
 
 def follow_redirect(short_url):
     """
@@ -59,10 +65,20 @@ def follow_redirect(short_url):
         str: 重定向后的最终URL
     """
     try:
-        response = requests.head(short_url, allow_redirects=True)
+        guard.check(short_url)
+    except FetchRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    try:
+        response = get_session().head(short_url, allow_redirects=True)
+        # 失效的短链接（404/410）进入负缓存，5xx计入熔断器
+        response.raise_for_status()
+        guard.record_success(short_url)
         return response.url
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"跟踪链接重定向失败: {str(e)}")
+        detail = f"跟踪链接重定向失败: {str(e)}"
+        guard.record_failure(short_url, detail, is_deterministic_failure(e))
+        raise HTTPException(status_code=500, detail=detail)
 
 def extract_metadata(url, debug=False):
     """
@@ -81,8 +97,18 @@ def extract_metadata(url, debug=False):
     }
     
     try:
-        response = requests.get(url, headers=headers)
+        guard.check(url)
+    except FetchRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    try:
+        response = get_session().get(url, headers=headers)
         response.raise_for_status()
+        if is_login_redirect(response.url):
+            # 登录cookies已失效，下次使用浏览器时刷新
+            get_cookie_store().mark_stale()
+            raise LoginRequiredError(f"需要登录才能查看: {response.url}")
+        guard.record_success(url)
         
         # 保存HTML内容以便调试
         html_content = response.text
@@ -172,7 +198,8 @@ def extract_metadata(url, debug=False):
         result = {
             'title': title,
             'description': description,
-            'image_urls': image_urls
+            # 同一张图片带不同签名/规格时只保留一个
+            'image_urls': dedupe_image_urls(image_urls)
         }
         
         # 如果是调试模式，返回HTML源码
@@ -183,7 +210,17 @@ def extract_metadata(url, debug=False):
         
     except Exception as e:
         print(f"提取元数据失败: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"提取元数据失败: {str(e)}")
+        detail = f"提取元数据失败: {str(e)}"
+        # 只有网络层面的失败才记录，解析错误与上游健康状况无关
+        if isinstance(e, (requests.RequestException, LoginRequiredError)):
+            guard.record_failure(url, detail, is_deterministic_failure(e))
+        raise HTTPException(status_code=500, detail=detail)
+
+def with_image_variant(response, variant):
+    """把响应中的图片URL转换为指定规格"""
+    if variant:
+        response.image_urls = dedupe_image_urls(response.image_urls, variant)
+    return response
 
 @app.post("/extract/", response_model=XHSMetadataResponse)
 async def extract_xiaohongshu_metadata(request: XHSLinkRequest):
@@ -193,6 +230,8 @@ async def extract_xiaohongshu_metadata(request: XHSLinkRequest):
     从用户输入的文本中提取小红书链接，然后获取该链接的标题、描述和图片URL
     
     - **input_text**: 用户输入的文本，包含小红书分享链接
+    - **refresh**: 为true时忽略本地结果库中已保存的结果（结果超过 XHS_EXTRACT_CACHE_TTL 秒后也会重新抓取）
+    - **image_variant**: 图片规格，可选 original / webp / thumbnail，默认返回页面中的URL
     
     返回:
     - **title**: 帖子标题
@@ -206,19 +245,40 @@ async def extract_xiaohongshu_metadata(request: XHSLinkRequest):
     if not short_url:
         raise HTTPException(status_code=400, detail="未能从输入文本中提取到有效的小红书链接")
     
-    # 跟踪重定向获取最终URL
+    # 本地结果库中已有的结果直接返回，不再访问小红书
+    store = get_store()
+    if not request.refresh:
+        note_id = note_id_from_url(short_url)
+        if note_id:
+            cached = store.get_latest(note_id=note_id, max_age=CACHE_MAX_AGE)
+        else:
+            cached = store.get_latest(short_url=short_url, max_age=CACHE_MAX_AGE)
+        if cached:
+            try:
+                return with_image_variant(XHSMetadataResponse(**cached['data']), request.image_variant)
+            except ValidationError:
+                pass  # 其他服务保存的结果字段不同，重新抓取
+    
+    # 跟踪重定向获取最终URL（失效的短链接在负缓存有效期内会直接返回）
     final_url = follow_redirect(short_url)
     
     # 提取元数据
-    metadata = extract_metadata(final_url)
+    try:
+        metadata = extract_metadata(final_url)
+    except HTTPException:
+        # 最终页面确定性失败时，短链接也记入负缓存，下次连重定向都不用跟踪
+        guard.alias_failure(short_url, final_url)
+        raise
     
-    return XHSMetadataResponse(
+    response = XHSMetadataResponse(
         title=metadata['title'],
         description=metadata['description'],
         image_urls=metadata['image_urls'],
         original_url=short_url,
         extracted_url=final_url
     )
+    store.add(response.model_dump())
+    return with_image_variant(response, request.image_variant)
 
 @app.post("/extract_from_html/", response_model=XHSMetadataResponse)
 async def extract_from_html_sample(request: HTMLSampleRequest):
@@ -273,7 +333,7 @@ async def extract_from_html_sample(request: HTMLSampleRequest):
     return XHSMetadataResponse(
         title=title,
         description=description,
-        image_urls=image_urls,
+        image_urls=dedupe_image_urls(image_urls),
         original_url="",
         extracted_url=""
     )
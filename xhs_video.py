@@ -0,0 +1,201 @@
+"""
+视频笔记的视频地址提取与分段并行下载
+
+下载时先用 Range: bytes=0-0 探测文件大小和是否支持分段，然后把文件切成若干段，
+通过连接池并行请求各段，直接写入预先分配好大小的文件中对应的位置。
+进度保存在 <文件>.part.json，中断后再次调用会从每一段已写入的位置继续。
+上游不支持Range时退化为单连接下载。
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import get_session
+
+
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+DEFAULT_WORKERS = 8
+CHUNK_SIZE = 256 * 1024
+SEGMENT_RETRIES = 3
+REQUEST_TIMEOUT = 30
+
+_META_VIDEO_RE = re.compile(r'<meta\s+[^>]*?(?:name|property)="og:video"[^>]*?content="([^"]+)"', re.IGNORECASE)
+_MASTER_URL_RE = re.compile(r'"masterUrl"\s*:\s*"([^"]+)"')
+_VIDEO_TAG_RE = re.compile(r'<video\s+[^>]*?src="(https?://[^"]+)"', re.IGNORECASE)
+
+
+def extract_video_url(html):
+    """
+    从笔记页面HTML中提取视频地址
+
+    依次尝试 og:video 标签、页面初始数据中的 masterUrl、<video> 标签。
+
+    Args:
+        html (str): 页面HTML
+
+    Returns:
+        str: 视频URL，未找到时返回None
+    """
+    for pattern in (_META_VIDEO_RE, _MASTER_URL_RE, _VIDEO_TAG_RE):
+        match = pattern.search(html)
+        if match:
+            url = match.group(1)
+            # 页面初始数据中的URL以 / 转义斜杠
+            return url.replace('\\u002F', '/').replace('\\/', '/').replace('&amp;', '&')
+    return None
+
+
+class DownloadError(Exception):
+    """视频下载失败"""
+
+
+def _probe(session, url):
+    """返回 (文件大小, 是否支持Range)，大小未知时为None"""
+    response = session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=REQUEST_TIMEOUT)
+    try:
+        response.raise_for_status()
+        if response.status_code == 206:
+            content_range = response.headers.get('Content-Range', '')
+            total = content_range.rpartition('/')[2]
+            if total.isdigit():
+                return int(total), True
+        length = response.headers.get('Content-Length')
+        return (int(length) if length and length.isdigit() else None), False
+    finally:
+        response.close()
+
+
+def _download_single_stream(session, url, path):
+    tmp_path = path + '.part'
+    with session.get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        expected = response.headers.get('Content-Length')
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+    if expected and expected.isdigit() and os.path.getsize(tmp_path) != int(expected):
+        raise DownloadError(f"文件大小不一致: {os.path.getsize(tmp_path)} != {expected}")
+    os.replace(tmp_path, path)
+    return path
+
+
+class _SegmentState:
+    """记录每一段已写入的字节数，定期落盘用于断点续传"""
+
+    def __init__(self, state_path, url, size, segment_size):
+        self.state_path = state_path
+        self.key = {'url': url, 'size': size, 'segment_size': segment_size}
+        self.written = {}
+        self._lock = threading.Lock()
+        self._last_saved = 0.0
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if all(state.get(k) == v for k, v in self.key.items()):
+                    self.written = {int(index): done for index, done in state.get('written', {}).items()}
+            except (OSError, ValueError):
+                pass
+
+    def advance(self, index, nbytes):
+        with self._lock:
+            self.written[index] = self.written.get(index, 0) + nbytes
+            if time.monotonic() - self._last_saved >= 1.0:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.key, written=self.written), f)
+        os.replace(tmp_path, self.state_path)
+        self._last_saved = time.monotonic()
+
+
+def _download_segment(session, url, fd, index, start, end, state):
+    """下载 [start, end] 这一段中尚未写入的部分"""
+    for attempt in range(SEGMENT_RETRIES):
+        offset = start + state.written.get(index, 0)
+        if offset > end:
+            return
+        try:
+            headers = {'Range': f'bytes={offset}-{end}'}
+            with session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+                if response.status_code != 206:
+                    raise DownloadError(f"分段请求返回 {response.status_code}")
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    chunk = chunk[:end + 1 - offset]
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                    state.advance(index, len(chunk))
+            if offset > end:
+                return
+        except Exception as e:
+            if attempt == SEGMENT_RETRIES - 1:
+                raise DownloadError(f"分段 {index} 下载失败: {e}")
+    raise DownloadError(f"分段 {index} 下载不完整")
+
+
+def download_video(url, path, workers=DEFAULT_WORKERS, segment_size=DEFAULT_SEGMENT_SIZE, session=None):
+    """
+    分段并行下载视频
+
+    Args:
+        url (str): 视频URL
+        path (str): 保存路径
+        workers (int): 并行连接数
+        segment_size (int): 每段的字节数
+        session (requests.Session): 使用的连接池，默认使用共享的Session
+
+    Returns:
+        str: 保存路径
+    """
+    session = session or get_session()
+    size, ranged = _probe(session, url)
+    if not ranged or not size or workers <= 1:
+        return _download_single_stream(session, url, path)
+
+    tmp_path = path + '.part'
+    state = _SegmentState(path + '.part.json', url, size, segment_size)
+    if not os.path.exists(tmp_path):
+        state.written = {}
+
+    fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        # 预先分配文件大小，各段直接写入对应位置
+        if os.fstat(fd).st_size != size:
+            os.ftruncate(fd, size)
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except OSError:
+                pass
+
+        segments = [(index, start, min(start + segment_size, size) - 1)
+                    for index, start in enumerate(range(0, size, segment_size))]
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_download_segment, session, url, fd, index, start, end, state)
+                           for index, start, end in segments]
+                for future in futures:
+                    future.result()
+        finally:
+            state.save()
+    finally:
+        os.close(fd)
+
+    written = sum(state.written.get(index, 0) for index, _, _ in segments)
+    if written != size or os.path.getsize(tmp_path) != size:
+        raise DownloadError(f"文件大小不一致: 已写入 {written}，期望 {size}")
+    os.replace(tmp_path, path)
+    os.remove(state.state_path)
+    return path
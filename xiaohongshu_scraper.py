@@ -5,15 +5,19 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-import json
 import time
 import random
 import os
-import requests
-from urllib.parse import urlparse
 import re
 
+from xhs_links import find_first_link, note_id_from_url
+from result_store import ResultStore, get_store
+from cookie_store import get_cookie_store, XHS_HOME_URL
+from http_client import get_session, upstream_url, original_url
+from driver_resolver import resolve_chromedriver
+from xhs_images import dedupe_image_urls, image_extension
+from xhs_video import extract_video_url, download_video
+
 def extract_xiaohongshu_url(input_text):
     """
     从手机端复制的文本中提取小红书URL
@@ -25,24 +29,26 @@ def extract_xiaohongshu_url(input_text):
     Returns:
         str: 提取出的URL，如果未找到则返回None
     """
-    # 匹配 http://xhslink.com/a/ 开头的完整URL
-    pattern = r'http://xhslink\.com/a/[a-zA-Z0-9]+'
-    match = re.search(pattern, input_text)
-    
-    if match:
-        url = match.group(0)
-        print(f"已提取URL: {url}")
-        return url
+    link = find_first_link(input_text)
+    if link:
+        return link.url
         
     # 如果没有找到URL，提示用户
     print("警告：未能从输入文本中提取到有效的小红书链接")
     return None
 
 class XiaohongshuScraper:
-    def __init__(self):
-        """初始化Selenium WebDriver"""
+    def __init__(self, image_pipeline=None):
+        """
+        初始化Selenium WebDriver
+        
+        Args:
+            image_pipeline (ImagePipeline): 可选的图片后处理进程池，图片下载完成后立即提交处理
+        """
+        self.image_pipeline = image_pipeline
         self.setup_driver()
         self.is_logged_in = False
+        self.cookie_store = get_cookie_store()
         
     def setup_driver(self):
         """设置Chrome浏览器选项"""
@@ -62,19 +68,29 @@ class XiaohongshuScraper:
         # 设置中文语言
         chrome_options.add_argument('--lang=zh-CN')
         
-        # 初始化WebDriver
-        service = Service(ChromeDriverManager().install())
+        # 初始化WebDriver（驱动路径在进程内只解析一次，可离线使用）
+        service = Service(resolve_chromedriver())
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
         
         # 设置等待时间
         self.wait = WebDriverWait(self.driver, 20)  # 增加等待时间到20秒
         
-    def create_output_directory(self, title):
-        """创建输出目录"""
+    def warm_up(self):
+        """预热：完成首次导航并加载cookies，之后的第一次抓取无需再等待"""
+        try:
+            self.driver.get(upstream_url(XHS_HOME_URL))
+            self.load_cookies()
+        except Exception as e:
+            print(f"预热浏览器时出错: {str(e)}")
+        
+    def create_output_directory(self, title, note_id=None):
+        """创建输出目录，有笔记ID时以 <笔记ID>_<标题> 命名，标题相同的不同笔记不会共用目录"""
         # 清理标题，移除非法字符
         clean_title = re.sub(r'[<>:"/\\|?*]', '_', title)
         # 限制标题长度
         clean_title = clean_title[:50]
+        if note_id:
+            clean_title = f"{note_id}_{clean_title}"
         
         # 创建输出目录
         output_dir = os.path.join('xiaohongshu_posts', clean_title)
@@ -84,25 +100,24 @@ class XiaohongshuScraper:
     def download_image(self, url, output_dir, index):
         """下载单张图片"""
         try:
-            # 获取文件扩展名
-            parsed_url = urlparse(url)
-            path = parsed_url.path
-            ext = os.path.splitext(path)[1]
-            if not ext:
-                ext = '.jpg'  # 默认扩展名
+            # 获取文件扩展名（支持 !nd_dft_wlteh_webp_3 这类CDN规格后缀）
+            ext = image_extension(url)
                 
             # 构建文件名
             filename = f"{index:03d}{ext}"
             filepath = os.path.join(output_dir, filename)
             
             # 下载图片
-            response = requests.get(url, stream=True)
+            response = get_session().get(url, stream=True)
             response.raise_for_status()
             
-            with open(filepath, 'wb') as f:
+            # 先写临时文件再原子重命名，多个工作进程同时写同一目录时不会出现半个文件
+            tmp_path = f"{filepath}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     if chunk:
                         f.write(chunk)
+            os.replace(tmp_path, filepath)
                         
             print(f"已下载图片: {filename}")
             return filepath
@@ -111,13 +126,26 @@ class XiaohongshuScraper:
             print(f"下载图片失败: {url}, 错误: {str(e)}")
             return None
             
-    def download_images(self, image_urls, output_dir):
-        """下载所有图片"""
+    def download_images(self, image_urls, output_dir, variant=None):
+        """
+        下载所有图片
+        
+        Args:
+            image_urls (list): 图片URL列表，同一张图片的不同签名/规格只下载一次
+            output_dir (str): 输出目录
+            variant (str): 图片规格 original / webp / thumbnail，None表示下载页面中的URL
+        """
         downloaded_files = []
-        for i, url in enumerate(image_urls, 1):
+        batch = self.image_pipeline.start_note(output_dir) if self.image_pipeline else None
+        for i, url in enumerate(dedupe_image_urls(image_urls, variant), 1):
             filepath = self.download_image(url, output_dir, i)
             if filepath:
                 downloaded_files.append(filepath)
+                if batch:
+                    batch.add(filepath)
+        if batch:
+            # 不等待处理完成，manifest.json 会在全部图片处理完后写入
+            batch.close()
         return downloaded_files
         
     def login(self):
@@ -127,7 +155,7 @@ class XiaohongshuScraper:
             
         try:
             print("\n请登录小红书...")
-            self.driver.get('https://www.xiaohongshu.com')
+            self.driver.get(upstream_url('https://www.xiaohongshu.com'))
             
             # 等待用户手动登录 - 在API中这需要用户通过浏览器手动登录
             print("等待小红书网站加载，请稍后...")
@@ -144,10 +172,8 @@ class XiaohongshuScraper:
                     self.is_logged_in = True
                     print("登录成功！")
                     
-                    # 保存cookies
-                    cookies = self.driver.get_cookies()
-                    with open('xiaohongshu_cookies.json', 'w') as f:
-                        json.dump(cookies, f)
+                    # 保存cookies，HTTP提取流程会共享这些cookies
+                    self.cookie_store.save_from_driver(self.driver)
                     
                     return True
             except Exception as e:
@@ -159,37 +185,41 @@ class XiaohongshuScraper:
             return False
             
     def load_cookies(self):
-        """加载已保存的cookies"""
+        """加载已保存的cookies（只在内存中没有可用cookies时才读取文件）"""
         try:
-            if os.path.exists('xiaohongshu_cookies.json'):
-                with open('xiaohongshu_cookies.json', 'r') as f:
-                    cookies = json.load(f)
-                for cookie in cookies:
-                    self.driver.add_cookie(cookie)
+            if self.cookie_store.apply_to_driver(self.driver):
+                self.is_logged_in = True
                 return True
         except Exception as e:
             print(f"加载cookies时出错: {str(e)}")
         return False
         
-    def scrape_post(self, url):
+    def ensure_logged_in(self):
+        """确保浏览器处于登录状态，cookies过期或失效时才重新从浏览器会话刷新"""
+        if self.is_logged_in and self.cookie_store.is_valid():
+            return True
+        if not self.is_logged_in and self.load_cookies():
+            return True
+        self.is_logged_in = False
+        return self.login()
+        
+    def scrape_post(self, url, image_variant=None):
         """
         抓取小红书帖子内容
         
         Args:
             url (str): 小红书帖子URL
+            image_variant (str): 下载的图片规格 original / webp / thumbnail，None表示页面中的URL
             
         Returns:
             dict: 包含标题、内容和图片URL的字典
         """
         try:
-            if not self.is_logged_in:
-                # 尝试加载已保存的cookies
-                if not self.load_cookies():
-                    if not self.login():
-                        return None
+            if not self.ensure_logged_in():
+                return None
             
             print("正在加载页面...")
-            self.driver.get(url)
+            self.driver.get(upstream_url(url))
             
             # 等待页面加载
             time.sleep(random.uniform(3, 5))
@@ -213,6 +243,12 @@ class XiaohongshuScraper:
                 title = "未找到标题"
                 print("警告：未找到标题")
             
+            try:
+                # 尝试获取作者昵称
+                author = self.driver.find_element(By.CSS_SELECTOR, ".author-wrapper .username, .author .name").text
+            except:
+                author = ""
+            
             try:
                 # 尝试获取正文内容
                 content_element = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".content, .desc")))
@@ -231,19 +267,38 @@ class XiaohongshuScraper:
                     src = img.get_attribute('src')
                     if src and not src.startswith('data:'):
                         image_urls.append(src)
+                image_urls = dedupe_image_urls(image_urls)
             except:
                 print("警告：提取图片URL时出错")
             
+            # 视频笔记：提取视频地址
+            video_url = extract_video_url(self.driver.page_source)
+            
             # 创建输出目录并下载图片
-            output_dir = self.create_output_directory(title)
-            downloaded_files = self.download_images(image_urls, output_dir)
+            extracted_url = original_url(self.driver.current_url)
+            note_id = note_id_from_url(extracted_url) or note_id_from_url(url)
+            output_dir = self.create_output_directory(title, note_id)
+            downloaded_files = self.download_images(image_urls, output_dir, image_variant)
+            
+            # 视频文件较大，使用分段并行下载
+            video_file = None
+            if video_url:
+                try:
+                    video_file = download_video(video_url, os.path.join(output_dir, 'video.mp4'))
+                    print("已下载视频: video.mp4")
+                except Exception as e:
+                    print(f"下载视频失败: {video_url}, 错误: {str(e)}")
             
             return {
                 'title': title,
+                'author': author,
                 'content': content,
                 'image_urls': image_urls,
                 'downloaded_files': downloaded_files,
-                'output_dir': output_dir
+                'video_url': video_url,
+                'video_file': video_file,
+                'output_dir': output_dir,
+                'extracted_url': extracted_url
             }
             
         except TimeoutException:
@@ -258,11 +313,26 @@ class XiaohongshuScraper:
         if self.driver:
             self.driver.quit()
 
-def save_to_file(data, filename='xiaohongshu_content.json'):
-    """将抓取的数据保存到JSON文件"""
+def save_to_file(data, db_path=None):
+    """
+    将抓取的数据追加到本地结果库
+    
+    Args:
+        data (dict): 抓取结果
+        db_path (str): SQLite数据库路径（.db），默认使用共享的结果库
+    """
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-        print(f"数据已保存到 {filename}")
+        if db_path and not db_path.endswith(('.db', '.sqlite', '.sqlite3')):
+            # 旧版本写入JSON文件，避免把数据库写到 .json 文件名下
+            raise ValueError(f"结果库路径需要是SQLite数据库文件（.db）: {db_path}")
+        if db_path:
+            store = ResultStore(db_path)
+            store.add(data)
+            store.close()
+        else:
+            store = get_store()
+            store.add(data)
+            store.flush()
+        print(f"数据已保存到 {store.path}")
     except Exception as e:
-        print(f"保存文件时出错: {e}") 
\ No newline at end of file
+        print(f"保存文件时出错: {e}")